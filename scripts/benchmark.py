@@ -0,0 +1,402 @@
+import argparse
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from .data_clean import convertir_codes_communes, troncature_lots
+from .data_visualization import (
+    carte_choropleth_departements_prix_m2,
+    carte_choropleth_departements_surfaces,
+)
+from .do_ols import run_log_ols_regression
+from .get_data import extract_departements, get_local_csv
+from .global_variables import var_explicative_modeles
+from .spatial_join import IndexSpatial, valider_codes_communes
+from .kernels import (
+    OBJECTIF_ACCELERATION,
+    agregation_groupee,
+    decrire_groupes,
+    masque_troncature_lignes,
+)
+
+
+GEOJSON_DEPARTEMENTS = os.path.join(
+    os.path.dirname(__file__), '..', 'Données', 'data', 'departements-100m.geojson'
+)
+FICHIER_RESULTATS = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'resultats.jsonl')
+COLONNE_PRIX = 'rapport valeur foncière et surface bâtie'
+
+# Benchmarks qui utilisent l'index spatial des départements (construit
+# seulement si l'un d'eux est demandé)
+BENCHMARKS_INDEX_SPATIAL = {'assigner_departements', 'valider_codes_communes'}
+# Benchmarks dont l'entrée est une ligne par commune et non le DVF : leur
+# débit est compté en communes par minute
+BENCHMARKS_PAR_COMMUNE = {'run_log_ols_regression'}
+
+# Noyau de `kernels.py` -> calcul pandas équivalent, pour l'objectif
+# d'accélération. Seuls les noyaux qui l'atteignent sont utilisés dans les
+# analyses : la troncature par commune (`troncature_lots`). Le describe
+# par commune l'atteint aussi, mais les analyses ne décrivent que par
+# type de local (trois groupes), où le noyau ne l'atteint pas.
+COMPARAISONS = {
+    'noyau_troncature_communes': 'pandas_troncature_communes',
+    'noyau_mediane_departements': 'pandas_mediane_departements',
+    'noyau_describe_communes': 'pandas_describe_communes',
+    'noyau_describe_type_local': 'pandas_describe_type_local',
+}
+
+
+def _centres_departements(geojson_path=GEOJSON_DEPARTEMENTS):
+    """
+    Centre approximatif (moyenne des sommets) de chaque département.
+    """
+    with open(geojson_path, 'r', encoding='utf-8') as f:
+        geojson = json.load(f)
+    centres = {}
+    for feature in geojson['features']:
+        geometrie = feature['geometry']
+        polygones = geometrie['coordinates']
+        if geometrie['type'] == 'Polygon':
+            polygones = [polygones]
+        points = np.concatenate([np.asarray(p[0]) for p in polygones])
+        centres[feature['properties']['code']] = points.mean(axis=0)
+    return centres
+
+
+def communes_reference(seed=0):
+    """
+    Communes de `liste_communes.csv` avec un poids de tirage à queue lourde
+    (quelques communes concentrent une grande part des ventes, comme dans
+    DVF) et des coordonnées proches du centre de leur département.
+
+    Retour
+    ------
+    pd.DataFrame
+        Colonnes 'code_commune', 'nom_commune', 'departement', 'poids',
+        'latitude', 'longitude'
+    """
+    rng = np.random.default_rng(seed)
+    communes = get_local_csv('liste_communes', dtype=str)
+    communes = communes[communes['TYPECOM'] == 'COM']
+    communes = pd.DataFrame({
+        'code_commune': communes['COM'].to_numpy(),
+        'nom_commune': communes['LIBELLE'].to_numpy(),
+        'departement': communes['DEP'].to_numpy(),
+    })
+
+    poids = rng.lognormal(mean=0.0, sigma=1.5, size=len(communes))
+    communes['poids'] = poids / poids.sum()
+
+    centres = _centres_departements()
+    centre = np.array([centres.get(d, (2.5, 46.5)) for d in communes['departement']])
+    communes['longitude'] = centre[:, 0] + rng.normal(0, 0.25, len(communes))
+    communes['latitude'] = centre[:, 1] + rng.normal(0, 0.18, len(communes))
+    return communes
+
+
+def generer_dvf_synthetique(n_lignes=1_000_000, seed=0, part_multi_lots=0.1,
+                            annees=(2020, 2021, 2022, 2023, 2024), communes=None):
+    """
+    Génère un jeu de transactions au format DVF, sans accès aux données S3.
+
+    Paramètres
+    ----------
+    n_lignes : int
+        Nombre de lignes (1M à 50M)
+    seed : int
+        Graine aléatoire
+    part_multi_lots : float
+        Part des mutations comportant plusieurs lignes (même id_mutation)
+    annees : tuple
+        Années des dates de mutation
+    communes : pd.DataFrame, optional
+        Sortie de `communes_reference` (recalculée sinon)
+
+    Retour
+    ------
+    pd.DataFrame
+        Colonnes principales de DVF, dont 'code_commune' (str),
+        'type_local', 'surface_reelle_bati', 'valeur_fonciere' et
+        'rapport valeur foncière et surface bâtie'
+    """
+    rng = np.random.default_rng(seed)
+    if communes is None:
+        communes = communes_reference(seed)
+
+    # Mutations : la plupart à une ligne, une part à 2 ou 3 lignes
+    n_mutations = int(n_lignes / (1 + 1.5 * part_multi_lots))
+    lignes_par_mutation = np.ones(n_mutations, dtype=np.int64)
+    multi = rng.random(n_mutations) < part_multi_lots
+    lignes_par_mutation[multi] = rng.integers(2, 4, multi.sum())
+    lignes_par_mutation = lignes_par_mutation[np.cumsum(lignes_par_mutation) <= n_lignes]
+    n_mutations = len(lignes_par_mutation)
+    id_mutation = np.repeat(np.arange(n_mutations), lignes_par_mutation)
+    n = len(id_mutation)
+
+    # Commune et date communes à toutes les lignes d'une mutation
+    idx_commune = rng.choice(len(communes), size=n_mutations, p=communes['poids'].to_numpy())
+    debut = np.datetime64(f'{min(annees)}-01-01')
+    n_jours = (np.datetime64(f'{max(annees) + 1}-01-01') - debut).astype(int)
+    dates = debut + rng.integers(0, n_jours, n_mutations).astype('timedelta64[D]')
+    idx_commune = idx_commune[id_mutation]
+
+    # Prix au m² : niveau propre à la commune, bruit individuel
+    niveau_commune = rng.lognormal(mean=7.8, sigma=0.5, size=len(communes))
+    type_local = np.where(rng.random(n) < 0.55, 'Maison', 'Appartement')
+    maison = type_local == 'Maison'
+    surface = np.where(maison, rng.gamma(9.0, 12.0, n), rng.gamma(4.0, 14.0, n)).round()
+    surface = np.maximum(surface, 9)
+    prix_m2 = niveau_commune[idx_commune] * rng.lognormal(0.0, 0.35, n)
+    valeur = (prix_m2 * surface).round(-2)
+
+    df = pd.DataFrame({
+        'id_mutation': np.char.add('2020-', id_mutation.astype(str)),
+        'date_mutation': dates[id_mutation],
+        'nature_mutation': 'Vente',
+        'valeur_fonciere': valeur,
+        'code_commune': communes['code_commune'].to_numpy()[idx_commune],
+        'nom_commune': communes['nom_commune'].to_numpy()[idx_commune],
+        'nombre_lots': np.where(lignes_par_mutation[id_mutation] > 1, lignes_par_mutation[id_mutation], 0),
+        'type_local': type_local,
+        'surface_reelle_bati': surface,
+        'latitude': communes['latitude'].to_numpy()[idx_commune] + rng.normal(0, 0.02, n),
+        'longitude': communes['longitude'].to_numpy()[idx_commune] + rng.normal(0, 0.02, n),
+    })
+    df['rapport valeur foncière et surface bâtie'] = df['valeur_fonciere'] / df['surface_reelle_bati']
+    return df
+
+
+def generer_dossier_complet_synthetique(codes_communes, variables=var_explicative_modeles, seed=0):
+    """
+    Génère un dossier complet INSEE synthétique (une ligne par commune) avec
+    les variables explicatives demandées (par défaut celles de tous les
+    modèles, comme `get_dossier_complet`).
+
+    Retour
+    ------
+    pd.DataFrame
+        Variables en float32, indexées par 'CODGEO'
+    """
+    rng = np.random.default_rng(seed)
+    codes = pd.Index(pd.unique(np.asarray(codes_communes, dtype=str)), name='CODGEO')
+    taille = rng.lognormal(mean=6.5, sigma=1.3, size=len(codes))
+    donnees = {
+        v: (taille * rng.uniform(0.05, 0.6, len(codes))).astype(np.float32)
+        for v in variables
+    }
+    return pd.DataFrame(donnees, index=codes)
+
+
+def _mesurer(fonction, repetitions):
+    """
+    Exécute `fonction` plusieurs fois et renvoie les durées et le temps CPU,
+    puis mesure le pic mémoire (tracemalloc) lors d'une exécution
+    supplémentaire, non chronométrée (tracemalloc ralentit fortement
+    l'exécution).
+    """
+    durees, cpus = [], []
+    for _ in range(repetitions):
+        debut, debut_cpu = time.perf_counter(), time.process_time()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+        cpus.append(time.process_time() - debut_cpu)
+
+    tracemalloc.start()
+    try:
+        fonction()
+        pic = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'duree_mediane_s': float(np.median(durees)),
+        'duree_min_s': float(np.min(durees)),
+        'cpu_median_s': float(np.median(cpus)),
+        'pic_memoire_mo': pic / 1e6,
+    }
+
+
+def _troncature_pandas(df, cle, colonne, bas=0.025, haut=0.975):
+    quantiles = df.groupby(cle)[colonne].quantile([bas, haut]).unstack()
+    q_bas, q_haut = df[cle].map(quantiles[bas]), df[cle].map(quantiles[haut])
+    return q_bas, q_haut, (df[colonne] > q_bas) & (df[colonne] < q_haut)
+
+
+def _benchmarks(dvf, dossier_complet, noms=None):
+    """
+    Chemins critiques mesurés, sous forme {nom: fonction sans argument}.
+
+    L'index spatial n'est construit (avant toute mesure) que si `noms`
+    contient un benchmark de BENCHMARKS_INDEX_SPATIAL (None : tous).
+    """
+    codes_mixtes = dvf[['code_commune']].copy()
+    # Codes numériques (perte des zéros initiaux) comme dans certains exports
+    codes_mixtes['code_commune'] = codes_mixtes['code_commune'].astype(object)
+    codes_mixtes.loc[codes_mixtes.index[::2], 'code_commune'] = (
+        pd.to_numeric(codes_mixtes['code_commune'].iloc[::2], errors='coerce')
+    )
+
+    y = dvf.groupby('code_commune')['rapport valeur foncière et surface bâtie'].mean()
+    y.name = 'prix_m2'
+
+    index_departements = None
+    if noms is None or BENCHMARKS_INDEX_SPATIAL & set(noms):
+        index_departements = IndexSpatial.depuis_fichier(GEOJSON_DEPARTEMENTS)
+
+    par_departement = dvf[[COLONNE_PRIX]].assign(departement=extract_departements(dvf['code_commune']))
+
+    return {
+        'troncature_lots': lambda: troncature_lots(dvf),
+        'convertir_codes_communes': lambda: convertir_codes_communes(codes_mixtes.copy()),
+        'carte_choropleth_prix_m2': lambda: carte_choropleth_departements_prix_m2(
+            dvf, geojson_path=GEOJSON_DEPARTEMENTS),
+        'carte_choropleth_surfaces': lambda: carte_choropleth_departements_surfaces(
+            dvf, geojson_path=GEOJSON_DEPARTEMENTS),
+        'run_log_ols_regression': lambda: run_log_ols_regression(y, dossier_complet),
+        'assigner_departements': lambda: index_departements.assigner(
+            dvf['longitude'].to_numpy(), dvf['latitude'].to_numpy()),
+        'valider_codes_communes': lambda: valider_codes_communes(dvf, index_departements),
+        # Noyaux de kernels.py contre leur équivalent pandas (COMPARAISONS)
+        'noyau_troncature_communes': lambda: masque_troncature_lignes(
+            dvf['code_commune'], dvf[COLONNE_PRIX].to_numpy(dtype=np.float64)),
+        'pandas_troncature_communes': lambda: _troncature_pandas(dvf, 'code_commune', COLONNE_PRIX),
+        'noyau_mediane_departements': lambda: agregation_groupee(
+            par_departement, 'departement', COLONNE_PRIX, 'median'),
+        'pandas_mediane_departements': lambda: par_departement.groupby(
+            'departement', as_index=False)[COLONNE_PRIX].median(),
+        'noyau_describe_communes': lambda: decrire_groupes(dvf, 'code_commune', COLONNE_PRIX),
+        'pandas_describe_communes': lambda: dvf.groupby('code_commune')[COLONNE_PRIX].describe(),
+        'noyau_describe_type_local': lambda: decrire_groupes(dvf, 'type_local', 'surface_reelle_bati'),
+        'pandas_describe_type_local': lambda: dvf.groupby('type_local')['surface_reelle_bati'].describe(),
+    }
+
+
+def _commit_courant():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(__file__), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executer_benchmarks(n_lignes=1_000_000, repetitions=3, noms=None, seed=0,
+                        fichier_resultats=FICHIER_RESULTATS):
+    """
+    Mesure les chemins critiques sur des données synthétiques et ajoute les
+    résultats au fichier JSON Lines, avec le commit courant, pour comparer
+    les performances d'un commit à l'autre.
+
+    Paramètres
+    ----------
+    n_lignes : int
+        Taille du DVF synthétique
+    repetitions : int
+        Nombre d'exécutions chronométrées par benchmark (plus une exécution
+        pour la mémoire)
+    noms : list, optional
+        Benchmarks à exécuter (par défaut tous)
+    seed : int
+        Graine des données synthétiques
+    fichier_resultats : str | None
+        Fichier JSON Lines de résultats (None pour ne pas enregistrer)
+
+    Retour
+    ------
+    pd.DataFrame
+        Une ligne par benchmark
+    """
+    dvf = generer_dvf_synthetique(n_lignes, seed=seed)
+    dossier_complet = generer_dossier_complet_synthetique(dvf['code_commune'], seed=seed)
+    benchmarks = _benchmarks(dvf, dossier_complet, noms)
+    noms = list(benchmarks) if noms is None else list(noms)
+
+    contexte = {
+        'commit': _commit_courant(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'n_lignes': len(dvf),
+        'repetitions': repetitions,
+    }
+
+    resultats = []
+    for nom in noms:
+        mesure = _mesurer(benchmarks[nom], repetitions)
+        mesure['lignes_entree'] = len(dossier_complet) if nom in BENCHMARKS_PAR_COMMUNE else len(dvf)
+        mesure['lignes_par_minute'] = mesure['lignes_entree'] / mesure['duree_mediane_s'] * 60
+        resultats.append({**contexte, 'benchmark': nom, **mesure})
+        unite = 'communes' if nom in BENCHMARKS_PAR_COMMUNE else 'lignes'
+        print(f"{nom:<30} {mesure['duree_mediane_s']:8.3f} s  {mesure['pic_memoire_mo']:9.1f} Mo"
+              f"  {mesure['lignes_par_minute'] / 1e6:8.1f} M {unite}/min")
+
+    if fichier_resultats:
+        os.makedirs(os.path.dirname(os.path.abspath(fichier_resultats)), exist_ok=True)
+        with open(fichier_resultats, 'a', encoding='utf-8') as f:
+            for r in resultats:
+                f.write(json.dumps(r, ensure_ascii=False) + '\n')
+
+    resultats = pd.DataFrame(resultats)
+    objectifs = verifier_objectifs(resultats)
+    for ligne in objectifs.itertuples():
+        statut = 'atteint' if ligne.objectif_atteint else 'NON atteint'
+        print(f"{ligne.noyau:<30} x{ligne.acceleration:6.2f} (objectif x{OBJECTIF_ACCELERATION:g} {statut})")
+    return resultats
+
+
+def verifier_objectifs(resultats, objectif=OBJECTIF_ACCELERATION):
+    """
+    Accélération de chaque noyau de `kernels.py` par rapport à son
+    équivalent pandas (rapport des durées médianes), comparée à l'objectif.
+
+    Paramètres
+    ----------
+    resultats : pd.DataFrame
+        Sortie de `executer_benchmarks` (les deux benchmarks de chaque paire
+        doivent avoir été exécutés)
+    objectif : float
+        Accélération minimale attendue
+
+    Retour
+    ------
+    pd.DataFrame
+        Colonnes 'noyau', 'pandas', 'acceleration' et 'objectif_atteint'
+    """
+    durees = resultats.set_index('benchmark')['duree_mediane_s']
+    lignes = [
+        {'noyau': noyau, 'pandas': reference, 'acceleration': durees[reference] / durees[noyau]}
+        for noyau, reference in COMPARAISONS.items()
+        if noyau in durees.index and reference in durees.index
+    ]
+    tableau = pd.DataFrame(lignes, columns=['noyau', 'pandas', 'acceleration'])
+    tableau['objectif_atteint'] = tableau['acceleration'] >= objectif
+    return tableau
+
+
+def comparer_benchmarks(fichier_resultats=FICHIER_RESULTATS, mesure='duree_mediane_s'):
+    """
+    Compare les résultats enregistrés : une ligne par benchmark et taille,
+    une colonne par commit (dans l'ordre chronologique).
+    """
+    df = pd.read_json(fichier_resultats, lines=True)
+    ordre = df.sort_values('date')['commit'].drop_duplicates()
+    tableau = df.pivot_table(index=['benchmark', 'n_lignes'], columns='commit',
+                             values=mesure, aggfunc='min')
+    return tableau[[c for c in ordre if c in tableau.columns]]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks sur données DVF synthétiques")
+    parser.add_argument('--lignes', type=int, default=1_000_000)
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--benchmark', action='append', dest='noms')
+    args = parser.parse_args()
+    executer_benchmarks(args.lignes, args.repetitions, args.noms)
@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
 
+from .kernels import masque_troncature_lignes
+
 
 def convertir_codes_communes(df):
     """
@@ -29,7 +32,7 @@ def convertir_codes_communes(df):
     return df
 
 
-def filtre_donnes_pop(df_pop):
+def filtre_donnes_pop(df_pop, cols=None):
     """
     Identifie les lignes contenant des valeurs manquantes dans les colonnes
     de population d'intérêt et retourne uniquement ces lignes.
@@ -38,14 +41,16 @@ def filtre_donnes_pop(df_pop):
     ----------
     df_pop : pd.DataFrame
         DataFrame de population (ex ici : INSEE) contenant la colonne 'p19_pop' (population en 2019)
+    cols : list, optional
+        Colonnes de population à contrôler (par défaut ['p19_pop'])
 
     Retour
     ------
     pd.DataFrame
         Lignes présentant au moins une valeur manquante
     """
-    cols = ["p19_pop"]
-    df_pop[cols].isna().sum()
+    if cols is None:
+        cols = ["p19_pop"]
     lignes_na = df_pop[df_pop[cols].isna().any(axis=1)]
     return lignes_na
 
@@ -87,27 +92,14 @@ def troncature_lots(df1):
     pd.DataFrame
         DataFrame tronqué
     """
-    # Calcul des quantiles 0.025 et 0.975 par commune :
-    quantiles_par_commune = (
-        df1
-        .groupby('code_commune')['rapport valeur foncière et surface bâtie']
-        .quantile([0.025, 0.975])
-        .unstack()
-        .reset_index()
-        .rename(columns={0.025: 'quantile_025', 0.975: 'quantile_975'})
-    )
-
-    # Fusionner les quantiles avec df_sans_lots
-    df2 = df1.merge(
-        quantiles_par_commune,
-        on='code_commune',
-        how='left'
+    # Quantiles 0.025 et 0.975 de la commune de chaque ligne, calculés à
+    # partir d'un seul tri (cf. `noyau_troncature_communes` dans benchmark.py)
+    q_bas, q_haut, garde = masque_troncature_lignes(
+        df1['code_commune'],
+        df1['rapport valeur foncière et surface bâtie'].to_numpy(dtype=np.float64)
     )
 
-    df2 = df2[
-        (df2['rapport valeur foncière et surface bâtie'] > df2['quantile_025']) &
-        (df2['rapport valeur foncière et surface bâtie'] < df2['quantile_975'])
-    ]
+    df2 = df1.assign(quantile_025=q_bas, quantile_975=q_haut)[garde].reset_index(drop=True)
 
     return df2
 
@@ -135,3 +127,149 @@ def ajout_non_communes(df_sans_lots, communes_df):
                                     how='left')
 
     return df_sans_lots
+
+
+# Colonnes identifiant un local au sein d'une mutation
+COLONNES_LOCAL = ['id_parcelle', 'type_local', 'lot1_numero', 'surface_reelle_bati']
+
+
+def _premieres_occurrences_locaux(df, codes_mutation):
+    """
+    Masque des lignes décrivant un local pour la première fois dans sa
+    mutation (False pour les répétitions d'un même local).
+    """
+    colonnes = [c for c in COLONNES_LOCAL if c in df.columns]
+    cles = df[colonnes].reset_index(drop=True).assign(_mutation=codes_mutation)
+    return ~cles.duplicated().to_numpy()
+
+
+def classifier_mutations(df, types_logement=('Maison', 'Appartement'), ignorer_dependances=True):
+    """
+    Classe chaque mutation DVF selon les locaux qu'elle contient, en une
+    seule passe triée par identifiant de mutation.
+
+    DVF répète la ligne d'un local pour chaque nature de culture (ou
+    parcelle) de la mutation : les locaux sont dédoublonnés sur
+    `COLONNES_LOCAL` avant d'être comptés.
+
+    Catégories :
+    - 'simple' : un seul local, de type logement (maison ou appartement)
+    - 'multi_lots' : plusieurs logements du même type
+    - 'mixte' : plusieurs types de locaux (ex : maison et appartement, ou
+      logement et local industriel)
+    - 'sans_logement' : aucun logement (terrains, locaux seuls...)
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Données DVF brutes, avec 'id_mutation' et 'type_local'
+    types_logement : tuple
+        Types de locaux considérés comme des logements
+    ignorer_dependances : bool
+        Si True, les lignes 'Dépendance' (caves, garages) ne rendent pas une
+        mutation multiple ou mixte
+
+    Returns
+    -------
+    pd.Series
+        Catégorie de la mutation de chaque ligne (même index que df)
+    """
+    categories = np.array(['sans_logement', 'simple', 'multi_lots', 'mixte'])
+    if len(df) == 0:
+        # Aucune vente (ex : département ou mois sans transaction)
+        return pd.Series(
+            pd.Categorical.from_codes(np.array([], dtype=np.int8), categories=categories),
+            index=df.index,
+            name='categorie_mutation'
+        )
+
+    codes_mutation, ids = pd.factorize(df['id_mutation'], sort=False)
+    # Identifiant manquant : chaque ligne forme sa propre mutation
+    manquants = codes_mutation < 0
+    codes_mutation[manquants] = len(ids) + np.arange(manquants.sum())
+    codes_type, types = pd.factorize(df['type_local'], sort=False)
+
+    # Un bit par type de local, 0 pour les lignes sans local (et dépendances)
+    bits_types = np.left_shift(np.int64(1), np.arange(len(types), dtype=np.int64))
+    if ignorer_dependances:
+        bits_types[types == 'Dépendance'] = 0
+    bits = np.where(codes_type >= 0, bits_types[np.maximum(codes_type, 0)], 0)
+    # Une seule ligne par local distinct de la mutation
+    premier = _premieres_occurrences_locaux(df, codes_mutation)
+    logement = np.isin(codes_type, np.flatnonzero(types.isin(types_logement))) & premier
+    local = (bits != 0) & premier
+
+    # Tri unique par mutation, puis réductions par segment
+    ordre = np.argsort(codes_mutation, kind='stable')
+    tries = codes_mutation[ordre]
+    debuts = np.flatnonzero(np.r_[True, tries[1:] != tries[:-1]])
+    mutations = tries[debuts]
+
+    n_mutations = codes_mutation.max() + 1
+    n_locaux = np.zeros(n_mutations, dtype=np.int64)
+    n_logements = np.zeros(n_mutations, dtype=np.int64)
+    masque_types = np.zeros(n_mutations, dtype=np.int64)
+    n_locaux[mutations] = np.add.reduceat(local[ordre].astype(np.int64), debuts)
+    n_logements[mutations] = np.add.reduceat(logement[ordre].astype(np.int64), debuts)
+    masque_types[mutations] = np.bitwise_or.reduceat(bits[ordre], debuts)
+
+    # Nombre de types distincts = nombre de bits à 1
+    n_types = np.zeros(n_mutations, dtype=np.int64)
+    reste = masque_types.copy()
+    while reste.any():
+        n_types += reste & 1
+        reste >>= 1
+
+    categorie = np.select(
+        [n_logements == 0, n_types > 1, n_locaux > 1],
+        [0, 3, 2],
+        default=1
+    )
+    return pd.Series(
+        pd.Categorical.from_codes(categorie[codes_mutation], categories=categories),
+        index=df.index,
+        name='categorie_mutation'
+    )
+
+
+def construire_df_sans_lots(df, types_logement=('Maison', 'Appartement'), ignorer_dependances=True):
+    """
+    Construit df_sans_lots : les ventes d'un seul logement (mutations
+    'simple' de `classifier_mutations`), avec le rapport valeur foncière /
+    surface bâtie utilisé par `troncature_lots`.
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Données DVF brutes, avec 'id_mutation', 'type_local',
+        'valeur_fonciere' et 'surface_reelle_bati'
+    types_logement : tuple
+        Types de locaux considérés comme des logements
+    ignorer_dependances : bool
+        Si True, une vente de logement avec cave ou garage reste 'simple'
+
+    Returns
+    -------
+    pd.DataFrame
+        Une ligne par vente simple (la ligne du logement), avec la colonne
+        'rapport valeur foncière et surface bâtie'
+    """
+    categorie = classifier_mutations(df, types_logement, ignorer_dependances)
+    surface = df['surface_reelle_bati'].to_numpy(dtype=np.float64)
+    valeur = df['valeur_fonciere'].to_numpy(dtype=np.float64)
+
+    # Un seul masque, une seule copie : la ligne du logement des ventes simples
+    masque = (
+        (categorie.cat.codes.to_numpy() == 1)
+        & df['type_local'].isin(types_logement).to_numpy()
+        & (surface > 0)
+        & np.isfinite(valeur)
+    )
+    # Logement répété sur plusieurs lignes (natures de culture) : une seule ligne
+    ids = df['id_mutation'][masque]
+    repetees = np.zeros(len(df), dtype=bool)
+    repetees[np.flatnonzero(masque)] = (ids.duplicated() & ids.notna()).to_numpy()
+    masque &= ~repetees
+    df_sans_lots = df.loc[masque].copy()
+    df_sans_lots['rapport valeur foncière et surface bâtie'] = valeur[masque] / surface[masque]
+    return df_sans_lots
@@ -6,6 +6,8 @@ import numpy as np
 import json
 import sys
 
+from .get_data import extract_departements
+
 
 def carte_repartition_ventes(df):
     """
@@ -127,12 +129,8 @@ def scatter_prix_densite(geo_stats_with_info, df_final):
     from scipy import stats
     
     # Extraire le code département de df_final pour agréger
-    def extract_dept(code_commune):
-        code_str = str(code_commune)
-        return code_str[:2]
-    
     df_copy = df_final.reset_index().copy()
-    df_copy['departement'] = df_copy['code_commune'].astype(str).apply(extract_dept)
+    df_copy['departement'] = extract_departements(df_copy['code_commune'])
     
     # Calculer prix moyen par département
     prix_par_dept = df_copy.groupby('departement').agg({
@@ -281,13 +279,10 @@ def carte_choropleth_departements_prix_m2(
     if value_col not in df_source.columns:
         raise KeyError(f"La colonne '{value_col}' est absente des données.")
 
-    def extract_departement(code_commune):
-        code_commune = str(code_commune)
-        return code_commune[:2]
     df = df_source.copy()
     df = df.dropna(subset=['code_commune', value_col])
     df = df[df[value_col] > 0]
-    df['departement'] = df['code_commune'].astype(str).apply(extract_departement)
+    df['departement'] = extract_departements(df['code_commune'])
 
     if agg == 'mean':
         agg_df = df.groupby('departement', as_index=False)[value_col].mean()
@@ -353,14 +348,10 @@ def carte_choropleth_departements_surfaces(
         raise KeyError(f"La colonne '{value_col}' est absente des données.")
 
     # Extraire le code département (DOM gérés: 3 chiffres, sinon 2)
-    def extract_departement(code_commune):
-        code_commune = str(code_commune)
-        return code_commune[:2]
-
     df = df_source.copy()
     df = df.dropna(subset=['code_commune', value_col])
     df = df[df[value_col] > 0]
-    df['departement'] = df['code_commune'].astype(str).apply(extract_departement)
+    df['departement'] = extract_departements(df['code_commune'])
 
     if agg == 'mean':
         agg_df = df.groupby('departement', as_index=False)[value_col].mean()
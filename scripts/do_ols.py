@@ -6,9 +6,10 @@ from sklearn.pipeline import make_pipeline
 from sklearn.preprocessing import StandardScaler
 
 
-def run_log_ols_regression(y, X):
+def aligner_donnees_log_ols(y, X):
     """
-    Estime une régression linéaire avec transformation logarithmique de Y.
+    Aligne Y et X sur leur index commun et prépare les données de la
+    régression log-OLS (log(Y), constante ajoutée à X).
 
     Parameters
     ----------
@@ -19,10 +20,9 @@ def run_log_ols_regression(y, X):
 
     Returns
     -------
-    model : statsmodels.regression.linear_model.RegressionResults
-        Résultat de la régression OLS sur log(Y)
+    tuple (pd.Series, pd.DataFrame)
+        log(Y) et X avec constante, alignés et sans valeurs manquantes
     """
-
     # Garantir un index unique pour éviter InvalidIndexError lors de la concat
     if not y.index.is_unique:
         y = y.groupby(level=0).mean()
@@ -45,6 +45,28 @@ def run_log_ols_regression(y, X):
     # Ajout de la constante (intercept)
     X_aligned = sm.add_constant(X_aligned)
 
+    return y_aligned, X_aligned
+
+
+def run_log_ols_regression(y, X):
+    """
+    Estime une régression linéaire avec transformation logarithmique de Y.
+
+    Parameters
+    ----------
+    y : pd.Series
+        Variable dépendante (strictement positive)
+    X : pd.DataFrame
+        Variables explicatives
+
+    Returns
+    -------
+    model : statsmodels.regression.linear_model.RegressionResults
+        Résultat de la régression OLS sur log(Y)
+    """
+
+    y_aligned, X_aligned = aligner_donnees_log_ols(y, X)
+
     # Estimation du modèle OLS
     model = sm.OLS(y_aligned, X_aligned).fit()
 
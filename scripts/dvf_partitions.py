@@ -0,0 +1,219 @@
+import json
+import operator
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .get_data import extract_departement
+from .transaction_store import TransactionStore, ecrire_store
+
+
+INDEX_PARTITIONS = "_partitions.json"
+
+# Partition des transactions sans date exploitable (annee=__NA__)
+ANNEE_MANQUANTE = "__NA__"
+
+# Nombre maximal de valeurs distinctes mémorisées par colonne texte et par
+# partition pour l'élagage (ex : type_local, nature_mutation)
+MAX_VALEURS_STATS = 64
+
+OPERATEURS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda a, b: np.isin(a, list(b)),
+    "not in": lambda a, b: ~np.isin(a, list(b)),
+}
+
+
+def ecrire_partitions(df, racine, colonne_date="date_mutation"):
+    """
+    Écrit les transactions DVF nettoyées en jeu de données partitionné à la
+    Hive : racine/departement=XX/annee=YYYY/, chaque partition étant un
+    store en memory map (voir `transaction_store`).
+
+    Les transactions dont la date est manquante ou illisible sont écrites
+    dans la partition annee=__NA__ (année null dans l'index).
+
+    Un index à la racine recense les partitions, leur effectif et, pour les
+    colonnes texte peu variées (ex : type_local), les valeurs présentes, afin
+    d'écarter des partitions sans les ouvrir.
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Transactions DVF nettoyées, avec 'code_commune' et `colonne_date`
+        (ou une colonne 'annee')
+    racine : str
+        Dossier racine du jeu de données (remplacé s'il existe déjà)
+    colonne_date : str
+        Colonne de date utilisée pour l'année
+
+    Retour
+    ------
+    pd.DataFrame
+        Liste des partitions écrites (departement, annee, n_lignes)
+    """
+    df = df.copy()
+    df["departement"] = df["code_commune"].astype(str).map(extract_departement)
+    if "annee" not in df.columns:
+        df["annee"] = pd.to_datetime(df[colonne_date], errors="coerce").dt.year
+    df["annee"] = df["annee"].astype("Int64")
+
+    if os.path.exists(racine):
+        shutil.rmtree(racine)
+    os.makedirs(racine)
+
+    partitions = []
+    for (departement, annee), part in df.groupby(["departement", "annee"], sort=True, dropna=False):
+        annee = None if pd.isna(annee) else int(annee)
+        chemin = os.path.join(f"departement={departement}",
+                              f"annee={ANNEE_MANQUANTE if annee is None else annee}")
+        ecrire_store(part.drop(columns=["departement", "annee"]).reset_index(drop=True),
+                     os.path.join(racine, chemin))
+
+        stats = {}
+        for col in part.columns.drop(["departement", "annee"]):
+            dtype = part[col].dtype
+            if (pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+                    or isinstance(dtype, pd.CategoricalDtype)):
+                valeurs = part[col].dropna().unique()
+                if len(valeurs) <= MAX_VALEURS_STATS:
+                    stats[col] = sorted(str(v) for v in valeurs)
+
+        partitions.append({
+            "departement": str(departement),
+            "annee": annee,
+            "chemin": chemin,
+            "n_lignes": len(part),
+            "valeurs": stats,
+        })
+
+    with open(os.path.join(racine, INDEX_PARTITIONS), "w", encoding="utf-8") as f:
+        json.dump({"partitions": partitions}, f, ensure_ascii=False, indent=2)
+
+    return pd.DataFrame(partitions)[["departement", "annee", "n_lignes"]]
+
+
+def _partition_possible(partition, filtres):
+    """
+    Indique si une partition peut contenir des lignes satisfaisant les
+    filtres, d'après ses clés et les valeurs mémorisées dans l'index.
+    """
+    for col, op, valeur in filtres:
+        if col in ("departement", "annee"):
+            cle = partition[col]
+            if cle is None:
+                # Année manquante : ne satisfait aucun filtre sur l'année
+                return False
+            if col == "departement":
+                valeur = [str(v) for v in valeur] if op in ("in", "not in") else str(valeur)
+            if not bool(np.all(OPERATEURS[op](np.array([cle]), valeur))):
+                return False
+        elif col in partition["valeurs"]:
+            presentes = np.array(partition["valeurs"][col], dtype=object)
+            try:
+                if len(presentes) == 0 or not np.any(OPERATEURS[op](presentes, valeur)):
+                    return False
+            except TypeError:
+                # Valeur non comparable aux valeurs mémorisées : pas d'élagage
+                continue
+    return True
+
+
+def _masque_filtres(store, filtres):
+    """
+    Évalue les filtres directement sur les tableaux en memory map d'une
+    partition. Pour les colonnes texte, le filtre est évalué sur les
+    catégories puis propagé aux codes, sans matérialiser les chaînes.
+    """
+    masque = np.ones(len(store), dtype=bool)
+    for col, op, valeur in filtres:
+        if col in ("departement", "annee"):
+            continue
+        entree = store._colonnes[col]
+        brut = store.tableau(col)
+        if entree["type"] == "categorie":
+            categories = store.categories(col).astype(object)
+            ok = np.asarray(OPERATEURS[op](categories, valeur), dtype=bool)
+            codes = np.asarray(brut)
+            masque &= (codes >= 0) & ok[np.where(codes >= 0, codes, 0)]
+        elif entree["type"] == "datetime":
+            masque &= OPERATEURS[op](np.asarray(brut).view("datetime64[ns]"), np.datetime64(valeur))
+        else:
+            masque &= np.asarray(OPERATEURS[op](brut, valeur), dtype=bool)
+        if not masque.any():
+            break
+    return masque
+
+
+def lire_partitions(racine, departements=None, annees=None, filtres=None, colonnes=None):
+    """
+    Interroge un jeu de données écrit par `ecrire_partitions` en n'ouvrant
+    que les partitions utiles et en appliquant les filtres avant de charger
+    les colonnes demandées.
+
+    Paramètres
+    ----------
+    racine : str
+        Dossier racine du jeu de données
+    departements : list, optional
+        Départements à conserver (ex : ['75', '92'])
+    annees : list, optional
+        Années à conserver
+    filtres : list, optional
+        Filtres (colonne, opérateur, valeur), combinés par ET. Opérateurs :
+        '==', '!=', '<', '<=', '>', '>=', 'in', 'not in'.
+        Ex : [('type_local', '==', 'Maison'), ('surface_reelle_bati', '>', 0)]
+    colonnes : list, optional
+        Colonnes à renvoyer (par défaut toutes). 'departement' et 'annee'
+        peuvent être demandées.
+
+    Retour
+    ------
+    pd.DataFrame
+        Transactions satisfaisant les critères
+    """
+    filtres = list(filtres or [])
+    for _, op, _ in filtres:
+        if op not in OPERATEURS:
+            raise ValueError(f"Opérateur non supporté : {op}")
+    if departements is not None:
+        filtres.append(("departement", "in", [str(d) for d in departements]))
+    if annees is not None:
+        filtres.append(("annee", "in", [int(a) for a in annees]))
+
+    with open(os.path.join(racine, INDEX_PARTITIONS), encoding="utf-8") as f:
+        partitions = json.load(f)["partitions"]
+
+    morceaux = []
+    for partition in partitions:
+        if not _partition_possible(partition, filtres):
+            continue
+        store = TransactionStore(os.path.join(racine, partition["chemin"]))
+        masque = _masque_filtres(store, filtres)
+        if not masque.any():
+            continue
+
+        cles = [c for c in ("departement", "annee") if colonnes is not None and c in colonnes]
+        a_lire = store.colonnes if colonnes is None else [c for c in colonnes if c not in cles]
+        morceau = store.to_frame(a_lire, masque=np.flatnonzero(masque))
+        for cle in cles:
+            morceau[cle] = pd.NA if partition[cle] is None else partition[cle]
+        morceaux.append(morceau)
+
+    if not morceaux:
+        return pd.DataFrame(columns=colonnes)
+    # Les catégories diffèrent d'une partition à l'autre : on revient au texte
+    resultat = pd.concat(morceaux, ignore_index=True)
+    for col in resultat.columns:
+        if isinstance(resultat[col].dtype, pd.CategoricalDtype):
+            resultat[col] = resultat[col].astype(object)
+    if "annee" in resultat.columns:
+        resultat["annee"] = resultat["annee"].astype("Int64")
+    return resultat
@@ -0,0 +1,163 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from .get_data import extract_departements
+
+
+MOTIF_POPULATION = re.compile(r'^p(\d{2})_pop$')
+
+
+class EnrichissementVentes:
+    """
+    Taux de ventes par habitant et densités, par commune, département et
+    pour la France, pour toutes les années de ventes en une passe.
+
+    La table de population (`get_pop`) est convertie une seule fois en
+    matrice communes x années, indexée par une table de hachage des codes
+    communes ; les ventes sont ensuite comptées par (commune, année) avec
+    des index entiers, sans fusion de DataFrame.
+
+    Paramètres
+    ----------
+    df_pop : pd.DataFrame
+        Sortie de `get_pop` : 'code_commune' et colonnes 'pXX_pop'
+    superficies : pd.DataFrame, optional
+        Sortie de `get_departements_from_geojson` ('departement',
+        'superficie' en km²) pour la densité départementale
+    superficies_communes : pd.Series, optional
+        Superficie (km²) indexée par code commune, pour la densité communale
+    """
+
+    def __init__(self, df_pop, superficies=None, superficies_communes=None):
+        colonnes = {int(m.group(1)) + 2000: c for c in df_pop.columns
+                    if (m := MOTIF_POPULATION.match(str(c)))}
+        if not colonnes:
+            raise KeyError("Aucune colonne de population 'pXX_pop' trouvée.")
+        self.annees_pop = np.array(sorted(colonnes))
+
+        codes = df_pop['code_commune'].astype(str).str.zfill(5)
+        pop = (df_pop[[colonnes[a] for a in self.annees_pop]]
+               .apply(pd.to_numeric, errors='coerce')
+               .set_axis(codes))
+        pop = pop[~pop.index.duplicated(keep='first')]
+
+        # Valeurs manquantes traitées en bloc : année disponible la plus
+        # proche pour la commune (antérieure, sinon postérieure)
+        manquantes = pop.isna()
+        self.communes_sans_population = pop.index[manquantes.all(axis=1)]
+        self.valeurs_completees = int(manquantes.to_numpy().sum() - manquantes.all(axis=1).sum() * pop.shape[1])
+        pop = pop.ffill(axis=1).bfill(axis=1)
+
+        self.codes = pop.index
+        self.population = pop.to_numpy(dtype=np.float64)  # (n_communes, n_annees)
+        self.departements = pd.Index(extract_departements(pd.Series(self.codes)))
+        self.codes_departements, self.liste_departements = pd.factorize(self.departements, sort=True)
+
+        self.superficies = None
+        if superficies is not None:
+            self.superficies = superficies.set_index('departement')['superficie']
+        self.superficies_communes = superficies_communes
+
+    def indices_annees(self, annees):
+        """
+        Colonne de population à utiliser pour chaque année de vente :
+        l'année de population la plus récente qui ne lui est pas
+        postérieure (la plus ancienne disponible sinon).
+        """
+        annees = np.asarray(annees)
+        idx = np.searchsorted(self.annees_pop, annees, side='right') - 1
+        return np.clip(idx, 0, len(self.annees_pop) - 1)
+
+    def _taux(self, ventes, population, index, superficie=None):
+        resultat = pd.DataFrame({'ventes': ventes, 'population': population}, index=index)
+        resultat['ventes_pour_1000_hab'] = 1000 * resultat['ventes'] / resultat['population'].where(
+            resultat['population'] > 0)
+        if superficie is not None:
+            surface = superficie.reindex(index.get_level_values(0)).to_numpy()
+            resultat['superficie'] = surface
+            resultat['densite'] = resultat['population'] / surface
+            resultat['ventes_par_km2'] = resultat['ventes'] / surface
+        return resultat
+
+    def enrichir(self, df_ventes, colonne_date='date_mutation'):
+        """
+        Compte les ventes par commune, département et France pour chaque
+        année, et calcule les taux par habitant et les densités.
+
+        Paramètres
+        ----------
+        df_ventes : pd.DataFrame
+            Transactions avec 'code_commune' et `colonne_date` (ou 'annee')
+        colonne_date : str
+            Colonne de date de mutation
+
+        Retour
+        ------
+        dict
+            {'commune', 'departement', 'france'} -> pd.DataFrame indexé par
+            (zone, annee), avec 'ventes', 'population',
+            'ventes_pour_1000_hab' et, si les superficies sont connues,
+            'superficie', 'densite' et 'ventes_par_km2'. La clé
+            'ventes_sans_population' recense, par département et année, les
+            ventes de communes absentes de la table de population ou sans
+            population connue : elles ne sont comptées ni dans les
+            départements ni dans le total France. 'ventes_sans_date' est le
+            nombre de ventes écartées faute de date (ou d'année) lisible.
+        """
+        if 'annee' in df_ventes.columns:
+            annees_ventes = pd.to_numeric(df_ventes['annee'], errors='coerce')
+        else:
+            annees_ventes = pd.to_datetime(df_ventes[colonne_date], errors='coerce').dt.year
+        # Ventes sans date exploitable : écartées et comptées à part
+        datees = annees_ventes.notna().to_numpy()
+        ventes_sans_date = int((~datees).sum())
+        annees_ventes = annees_ventes.to_numpy()[datees].astype(np.int64)
+        codes_ventes = df_ventes['code_commune'].astype(str).str.zfill(5)[datees]
+
+        annees, idx_annee = np.unique(annees_ventes, return_inverse=True)
+        n_annees = len(annees)
+        pos = self.codes.get_indexer(codes_ventes)
+        connues = pos >= 0
+        # Communes de la table sans aucune population connue
+        population_connue = ~np.isnan(self.population).all(axis=1)
+
+        # Comptage (commune, année) en une passe sur une clé entière
+        cle = pos[connues] * n_annees + idx_annee[connues]
+        ventes = np.bincount(cle, minlength=len(self.codes) * n_annees).reshape(len(self.codes), n_annees)
+        population = self.population[:, self.indices_annees(annees)]
+
+        index_communes = pd.MultiIndex.from_product([self.codes, annees], names=['code_commune', 'annee'])
+        communes = self._taux(ventes.ravel(), population.ravel(), index_communes, self.superficies_communes)
+        communes = communes[communes['ventes'] > 0]
+
+        # Départements et France : seules les communes de population connue
+        # comptent (ventes et habitants) ; les autres sont recensées à part
+        ventes_comptees = ventes * population_connue[:, None]
+        n_dep = len(self.liste_departements)
+        ventes_dep = np.zeros((n_dep, n_annees))
+        pop_dep = np.zeros((n_dep, n_annees))
+        np.add.at(ventes_dep, self.codes_departements, ventes_comptees)
+        np.add.at(pop_dep, self.codes_departements, np.nan_to_num(population))
+        index_dep = pd.MultiIndex.from_product([self.liste_departements, annees], names=['departement', 'annee'])
+        departements = self._taux(ventes_dep.ravel(), pop_dep.ravel(), index_dep, self.superficies)
+
+        france = self._taux(ventes_comptees.sum(axis=0), np.nansum(population, axis=0),
+                            pd.MultiIndex.from_product([['FR'], annees], names=['zone', 'annee']))
+
+        sans_population = ~connues
+        sans_population[connues] = ~population_connue[pos[connues]]
+        inconnues = pd.DataFrame({
+            'departement': extract_departements(codes_ventes[sans_population]).to_numpy(),
+            'annee': annees_ventes[sans_population],
+        })
+        sans_population = inconnues.groupby(['departement', 'annee']).size().rename('ventes')
+
+        return {
+            'commune': communes,
+            'departement': departements,
+            'france': france,
+            'ventes_sans_population': sans_population,
+            'ventes_sans_date': ventes_sans_date,
+        }
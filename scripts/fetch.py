@@ -0,0 +1,227 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from .get_data import get_s3_filesystem
+
+
+TAILLE_BLOC = 8 * 1024 * 1024  # 8 Mo
+DESTINATION = os.path.join(os.path.dirname(__file__), '..', 'Données', 's3')
+
+
+def _etag_md5(info):
+    """
+    Renvoie le MD5 de l'objet distant s'il est connu (ETag d'un objet non
+    multipart, ou champ 'md5' des systèmes de fichiers de test), sinon None.
+    """
+    etag = info.get("ETag") or info.get("etag") or info.get("md5")
+    if etag is None:
+        return None
+    etag = str(etag).strip('"')
+    # Les ETag multipart ("<hash>-<nb parties>") ne sont pas des MD5
+    if "-" in etag or len(etag) != 32:
+        return None
+    return etag
+
+
+def _identite(info):
+    """
+    Identité de la version de l'objet distant (taille, ETag, date de
+    modification), conservée à côté des fichiers locaux pour détecter un
+    objet modifié entre deux téléchargements, même sans MD5 exploitable
+    (ETag multipart).
+    """
+    etag = info.get("ETag") or info.get("etag") or info.get("md5")
+    modifie = info.get("LastModified") or info.get("mtime") or info.get("created")
+    return {
+        "taille": int(info["size"]),
+        "etag": None if etag is None else str(etag).strip('"'),
+        "modifie": None if modifie is None else str(modifie),
+    }
+
+
+def _lire_identite(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _md5_fichier(path):
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for bloc in iter(lambda: f.read(TAILLE_BLOC), b""):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+class FetchManager:
+    """
+    Télécharge plusieurs objets du stockage S3 en parallèle, avec un client
+    partagé, reprise des téléchargements interrompus (lecture à partir d'un
+    décalage), vérification de taille/MD5 et métriques de progression.
+
+    Paramètres
+    ----------
+    destination : str
+        Dossier local de destination
+    fs : fsspec.AbstractFileSystem, optional
+        Système de fichiers distant. Par défaut, le S3 SSP Cloud partagé
+        (`get_s3_filesystem`). Tout système fsspec convient (ex : S3 local
+        simulé avec moto, ou système 'memory' pour les tests).
+    prefixe : str
+        Préfixe des objets distants
+    n_threads : int
+        Nombre de téléchargements simultanés
+    tentatives : int
+        Nombre maximal de tentatives par fichier
+    progression : callable, optional
+        Fonction appelée avec (nom, octets_recus, octets_total) après chaque bloc
+    """
+
+    def __init__(self, destination, fs=None, prefixe="renan/diffusion", n_threads=4,
+                 tentatives=3, taille_bloc=TAILLE_BLOC, progression=None):
+        self.destination = destination
+        self.fs = fs if fs is not None else get_s3_filesystem()
+        self.prefixe = prefixe.rstrip("/")
+        self.n_threads = n_threads
+        self.tentatives = tentatives
+        self.taille_bloc = taille_bloc
+        self.progression = progression
+        self._verrou = threading.Lock()
+        self.octets_recus = {}
+
+    def _chemin_distant(self, nom):
+        return f"{self.prefixe}/{nom}" if self.prefixe else nom
+
+    def _telecharger_un(self, nom):
+        """
+        Télécharge un objet (avec reprise et nouvelles tentatives) et renvoie
+        ses métriques.
+        """
+        chemin = self._chemin_distant(nom)
+        local = os.path.join(self.destination, nom)
+        partiel = local + ".part"
+        fichier_identite = local + ".meta.json"
+        debut = time.perf_counter()
+
+        info = self.fs.info(chemin)
+        total = int(info["size"])
+        md5 = _etag_md5(info)
+        identite = _identite(info)
+        identite_locale = _lire_identite(fichier_identite)
+
+        # Fichier déjà présent et complet (même version de l'objet distant)
+        if (os.path.exists(local) and os.path.getsize(local) == total
+                and identite_locale in (None, identite)):
+            if md5 is None or _md5_fichier(local) == md5:
+                return {"fichier": nom, "octets": total, "octets_telecharges": 0,
+                        "repris_a": None, "tentatives": 0, "duree_s": 0.0,
+                        "debit_mo_s": None, "md5_verifie": md5 is not None, "statut": "present"}
+
+        repris_a = os.path.getsize(partiel) if os.path.exists(partiel) else 0
+        # Fichier partiel d'une autre version de l'objet (ou d'origine
+        # inconnue) : il est écarté plutôt que complété
+        if repris_a and (repris_a > total or identite_locale != identite):
+            os.remove(partiel)
+            repris_a = 0
+        if not repris_a:
+            with open(fichier_identite, "w", encoding="utf-8") as f:
+                json.dump(identite, f)
+        telecharges = 0
+
+        for tentative in range(1, self.tentatives + 1):
+            try:
+                decalage = os.path.getsize(partiel) if os.path.exists(partiel) else 0
+                with self.fs.open(chemin, mode="rb", block_size=self.taille_bloc) as src, \
+                        open(partiel, "ab") as dst:
+                    src.seek(decalage)
+                    recus = decalage
+                    while recus < total:
+                        bloc = src.read(self.taille_bloc)
+                        if not bloc:
+                            break
+                        dst.write(bloc)
+                        recus += len(bloc)
+                        telecharges += len(bloc)
+                        with self._verrou:
+                            self.octets_recus[nom] = recus
+                        if self.progression is not None:
+                            self.progression(nom, recus, total)
+                if recus != total:
+                    raise IOError(f"{nom} : {recus} octets reçus sur {total}")
+                break
+            except Exception:
+                if tentative == self.tentatives:
+                    raise
+                time.sleep(min(2 ** (tentative - 1), 30))
+
+        if md5 is not None and _md5_fichier(partiel) != md5:
+            os.remove(partiel)
+            os.remove(fichier_identite)
+            raise IOError(f"Somme de contrôle MD5 invalide pour {nom}")
+        os.replace(partiel, local)
+
+        duree = time.perf_counter() - debut
+        return {
+            "fichier": nom,
+            "octets": total,
+            "octets_telecharges": telecharges,
+            "repris_a": repris_a or None,
+            "tentatives": tentative,
+            "duree_s": duree,
+            "debit_mo_s": telecharges / duree / 1e6 if duree > 0 else None,
+            "md5_verifie": md5 is not None,
+            "statut": "telecharge",
+        }
+
+    def telecharger(self, noms):
+        """
+        Télécharge les objets demandés en parallèle.
+
+        Paramètres
+        ----------
+        noms : list
+            Noms des objets (avec extension), relatifs au préfixe
+
+        Retour
+        ------
+        pd.DataFrame
+            Une ligne par fichier : taille, octets téléchargés, reprise,
+            tentatives, durée, débit et statut de vérification
+        """
+        os.makedirs(self.destination, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+            metriques = list(executor.map(self._telecharger_un, noms))
+        return pd.DataFrame(metriques)
+
+
+def telecharger_fichiers(noms, destination=DESTINATION, **kwargs):
+    """
+    Télécharge en parallèle plusieurs fichiers CSV du bucket S3 du projet.
+
+    Paramètres
+    ----------
+    noms : list
+        Noms des fichiers (avec ou sans extension .csv)
+    destination : str
+        Dossier local de destination (par défaut Données/s3 du dépôt)
+    **kwargs
+        Options de `FetchManager` (fs, n_threads, tentatives, progression...)
+
+    Retour
+    ------
+    pd.DataFrame
+        Métriques par fichier (voir `FetchManager.telecharger`)
+    Exemple
+    -------
+    telecharger_fichiers(["dvf_2020", "dvf_2021", "dossier_complet"])
+    """
+    noms = [n if n.endswith(".csv") else f"{n}.csv" for n in noms]
+    return FetchManager(destination, **kwargs).telecharger(noms)
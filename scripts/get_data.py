@@ -1,4 +1,6 @@
 import os
+import hashlib
+from functools import lru_cache
 import s3fs
 import pandas as pd
 import requests
@@ -6,6 +8,21 @@ from bs4 import BeautifulSoup
 import requests
 import geopandas as gpd
 
+from .global_variables import var_explicative_modeles
+
+
+@lru_cache(maxsize=None)
+def get_s3_filesystem():
+    """
+    Renvoie le système de fichiers S3 (SSP Cloud) partagé par les fonctions
+    de chargement, créé une seule fois par session.
+    """
+    S3_ENDPOINT_URL = "https://" + os.environ["AWS_S3_ENDPOINT"]
+    return s3fs.S3FileSystem(
+        anon=True,
+        client_kwargs={"endpoint_url": S3_ENDPOINT_URL}
+    )
+
 
 def get_cloud_csv(filename, sep=","):
     """
@@ -30,11 +47,7 @@ def get_cloud_csv(filename, sep=","):
     if not filename.endswith(".csv"):
         filename = f"{filename}.csv"
 
-    S3_ENDPOINT_URL = "https://" + os.environ["AWS_S3_ENDPOINT"]
-    fs = s3fs.S3FileSystem(
-        anon=True,
-        client_kwargs={"endpoint_url": S3_ENDPOINT_URL}
-    )
+    fs = get_s3_filesystem()
 
     with fs.open(f"renan/diffusion/{filename}", mode="rb") as f:
         df = pd.read_csv(
@@ -46,13 +59,98 @@ def get_cloud_csv(filename, sep=","):
     return df
 
 
-def get_local_csv(filename, sep=','):
+def get_dossier_complet(colonnes=None, prefixes=None, filename="dossier_complet",
+                        sep=";", cache_dir=None):
+    """
+    Charge le dossier complet INSEE en ne lisant que les colonnes utiles.
+
+    Les colonnes sont parsées en float32 et le DataFrame est indexé par code
+    commune (CODGEO). Le résultat projeté est mis en cache sur disque : un
+    second appel avec les mêmes colonnes ne relit pas S3.
+
+    Paramètres:
+    -----------
+    colonnes : list, optional
+        Noms des colonnes à charger. Par défaut, l'union des variables
+        explicatives de `global_variables`.
+    prefixes : list, optional
+        Préfixes de colonnes à charger en plus (ex : ["P22_", "C22_"])
+    filename : str
+        Nom du fichier sur S3
+    sep : str
+        Séparateur du fichier CSV
+    cache_dir : str, optional
+        Dossier du cache (par défaut Données/cache). None ou "" pour le
+        chemin par défaut, False pour désactiver le cache.
+
+    Retourne:
+    --------
+    pd.DataFrame
+        Colonnes demandées (float32), indexées par 'CODGEO'
+    Exemple:
+    --------
+    df = get_dossier_complet()
+    df = get_dossier_complet(prefixes=["P22_"])
+    """
+    if colonnes is None and prefixes is None:
+        colonnes = var_explicative_modeles
+    colonnes = list(colonnes or [])
+    prefixes = tuple(prefixes or ())
+
+    if not filename.endswith(".csv"):
+        filename = f"{filename}.csv"
+
+    cache_path = None
+    if cache_dir is not False:
+        if not cache_dir:
+            cache_dir = os.path.join(os.path.dirname(__file__), '..', 'Données', 'cache')
+        cle = "|".join([filename, ",".join(sorted(colonnes)), ",".join(sorted(prefixes))])
+        cache_path = os.path.join(
+            cache_dir, f"dossier_complet_{hashlib.md5(cle.encode()).hexdigest()[:12]}.pkl"
+        )
+        if os.path.exists(cache_path):
+            return pd.read_pickle(cache_path)
+
+    fs = get_s3_filesystem()
+    path = f"renan/diffusion/{filename}"
+
+    # Lecture de l'en-tête seul pour résoudre les colonnes et les préfixes
+    with fs.open(path, mode="rb") as f:
+        entete = pd.read_csv(f, sep=sep, nrows=0).columns
+
+    selection = [c for c in entete if c in colonnes or (prefixes and c.startswith(prefixes))]
+    manquantes = sorted(set(colonnes) - set(entete))
+    if manquantes:
+        raise KeyError(f"Colonnes absentes du dossier complet : {manquantes}")
+
+    dtype = {c: "float32" for c in selection}
+    dtype["CODGEO"] = "str"
+    with fs.open(path, mode="rb") as f:
+        df = pd.read_csv(
+            f,
+            sep=sep,
+            usecols=["CODGEO"] + selection,
+            dtype=dtype,
+            index_col="CODGEO"
+        )
+
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        df.to_pickle(cache_path)
+
+    return df
+
+
+def get_local_csv(filename, sep=',', dtype=None):
     """
     Charge un fichier CSV du dossier Données et retourne un DataFrame.
     Paramètres:
     -----------
     filename : str
         Nom du fichier CSV (avec ou sans l'extension .csv)
+    dtype : type | dict, optional
+        Types des colonnes, transmis à pd.read_csv (ex : str pour conserver
+        les zéros initiaux des codes communes)
     Retourne:
     --------
     pd.DataFrame
@@ -66,7 +164,7 @@ def get_local_csv(filename, sep=','):
     # Chemin complet du fichier
     file_path = os.path.join(donnees_path, filename)
     # Charger et retourner le DataFrame
-    return pd.read_csv(file_path, sep=sep)
+    return pd.read_csv(file_path, sep=sep, dtype=dtype)
 
 
 def get_pop():
@@ -85,7 +183,32 @@ def extract_departement(code_commune):
         Code commune au format INSEE.
     """
     code_commune = str(code_commune)
-    return code_commune[:2]       # Métropole
+    if len(code_commune) == 4 and code_commune.isdigit():
+        code_commune = code_commune.zfill(5)  # Zéro initial perdu (ex : 1001)
+    if code_commune[:2] in ('97', '98'):
+        return code_commune[:3]   # DOM / COM : 3 chiffres
+    return code_commune[:2]       # Métropole (dont 2A/2B)
+
+
+def extract_departements(codes_communes):
+    """
+    Version vectorisée de `extract_departement` pour une série de codes.
+
+    Paramètres
+    ----------
+    codes_communes : pd.Series
+        Codes communes au format INSEE
+
+    Retour
+    ------
+    pd.Series
+        Codes département, même index
+    """
+    codes = codes_communes.astype(str)
+    perte_zero = (codes.str.len() == 4) & codes.str.isdigit()
+    codes = codes.where(~perte_zero, codes.str.zfill(5))
+    outre_mer = codes.str[:2].isin(['97', '98'])
+    return codes.str[:2].where(~outre_mer, codes.str[:3])
 
 
 
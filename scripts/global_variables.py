@@ -43,3 +43,10 @@ var_explicative_appartment_lasso = [
     'C22_MENPSEUL',
     'C22_POP15P_STAT_GSEC13_23'
 ]
+
+# Union des variables explicatives des modèles (sans doublon, dans l'ordre)
+var_explicative_modeles = list(dict.fromkeys(
+    var_explicative_maison
+    + var_explicative_appartment
+    + var_explicative_appartment_lasso
+))
@@ -0,0 +1,313 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from .get_data import extract_departements
+
+
+COLONNE_PRIX = 'rapport valeur foncière et surface bâtie'
+NATIONAL = 'FR'
+
+
+def _mois(dates):
+    """
+    Convertit des dates en numéro de mois entier (année * 12 + mois - 1).
+    """
+    dates = pd.to_datetime(dates)
+    return (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype=np.int64)
+
+
+def _periode(mois):
+    return pd.Period(year=int(mois) // 12, month=int(mois) % 12 + 1, freq='M')
+
+
+def _moyenne_tronquee(valeurs, proportion):
+    """
+    Moyenne des valeurs strictement comprises entre les quantiles
+    `proportion` et `1 - proportion`, comme dans `troncature_lots`.
+    """
+    bas, haut = np.quantile(valeurs, [proportion, 1 - proportion])
+    garde = valeurs[(valeurs > bas) & (valeurs < haut)]
+    return float(garde.mean()) if len(garde) else np.nan
+
+
+class IndicesPrix:
+    """
+    Indices mensuels de prix au m² par commune et par département, mis à
+    jour de façon incrémentale à l'arrivée de nouveaux mois de DVF.
+
+    L'état conservé permet de ne jamais relire l'historique :
+
+    - les prix au m² triés de chaque (zone, mois), pour les moyennes
+      tronquées et médianes glissantes ; seules les fenêtres contenant un
+      mois modifié sont recalculées ;
+    - la dernière vente connue de chaque bien et les équations normales de
+      la régression des ventes répétées (Bailey-Muth-Nourse) par
+      département et au niveau national, mises à jour paire par paire.
+
+    Paramètres
+    ----------
+    fenetre : int
+        Nombre de mois de la fenêtre glissante
+    proportion_tronquee : float
+        Part retirée de chaque côté pour la moyenne tronquée
+    colonne_bien : str
+        Colonne identifiant la parcelle pour les ventes répétées (ex :
+        'id_parcelle'). Un bien est identifié par la parcelle, le type de
+        local, le numéro du premier lot ('lot1_numero') et la surface bâtie
+        arrondie au m², quand ces colonnes sont présentes : deux
+        appartements d'un même immeuble ne sont pas appariés. Les
+        appartements sans numéro de lot sont exclus des ventes répétées.
+    """
+
+    def __init__(self, fenetre=12, proportion_tronquee=0.025, colonne_bien='id_parcelle'):
+        self.fenetre = fenetre
+        self.proportion_tronquee = proportion_tronquee
+        self.colonne_bien = colonne_bien
+        # {(niveau, zone): {mois: np.ndarray trié}}
+        self.valeurs = {}
+        # {(niveau, zone, mois): dict de statistiques glissantes}
+        self._statistiques = {}
+        self._a_recalculer = set()
+        # Ventes répétées
+        self.origine = None
+        # Dernière vente connue de chaque bien (mois relatif, log du prix)
+        self.dernieres_ventes = pd.DataFrame(
+            {'t': pd.Series(dtype=np.int64), 'log_prix': pd.Series(dtype=np.float64)},
+            index=pd.Index([], dtype=object, name='bien'),
+        )
+        self.equations = {}
+
+    def ajouter(self, df, colonne_prix=COLONNE_PRIX, colonne_date='date_mutation'):
+        """
+        Intègre de nouvelles transactions (typiquement un ou plusieurs mois).
+
+        Paramètres
+        ----------
+        df : pd.DataFrame
+            Transactions avec 'code_commune', `colonne_date` et `colonne_prix`
+        colonne_prix : str
+            Colonne du prix au m²
+        colonne_date : str
+            Colonne de la date de mutation
+
+        Retour
+        ------
+        IndicesPrix
+            L'objet lui-même
+        """
+        df = df.dropna(subset=['code_commune', colonne_date, colonne_prix])
+        df = df[df[colonne_prix] > 0]
+        if df.empty:
+            return self
+
+        mois = _mois(df[colonne_date])
+        prix = df[colonne_prix].to_numpy(dtype=np.float64)
+        communes = df['code_commune'].astype(str)
+        departements = extract_departements(communes)
+
+        for niveau, zones in (('commune', communes), ('departement', departements)):
+            self._ajouter_valeurs(niveau, zones.to_numpy(), mois, prix)
+
+        if self.colonne_bien in df.columns:
+            self._ajouter_ventes_repetees(df, mois, prix, departements.to_numpy())
+        return self
+
+    def _ajouter_valeurs(self, niveau, zones, mois, prix):
+        cle = pd.DataFrame({'zone': zones, 'mois': mois, 'prix': prix})
+        for (zone, m), groupe in cle.groupby(['zone', 'mois'], sort=False)['prix']:
+            par_mois = self.valeurs.setdefault((niveau, zone), {})
+            nouvelles = groupe.to_numpy(dtype=np.float32)
+            if m in par_mois:
+                nouvelles = np.concatenate([par_mois[m], nouvelles])
+            par_mois[m] = np.sort(nouvelles)
+            # Fenêtres glissantes contenant ce mois
+            for fin in range(m, m + self.fenetre):
+                self._a_recalculer.add((niveau, zone, fin))
+
+    def _cles_biens(self, df):
+        """
+        Clé de chaque bien et masque des lignes utilisables pour les ventes
+        répétées.
+        """
+        biens = df[self.colonne_bien].astype(str)
+        eligibles = df[self.colonne_bien].notna().to_numpy(copy=True)
+        if 'type_local' in df.columns:
+            biens = biens + '|' + df['type_local'].astype(str)
+        if 'lot1_numero' in df.columns:
+            biens = biens + '|' + df['lot1_numero'].astype(str)
+            lot_connu = df['lot1_numero'].notna().to_numpy()
+        else:
+            lot_connu = np.zeros(len(df), dtype=bool)
+        if 'type_local' in df.columns:
+            # Plusieurs appartements par parcelle : le lot est indispensable
+            eligibles &= lot_connu | (df['type_local'] != 'Appartement').to_numpy()
+        if 'surface_reelle_bati' in df.columns:
+            surface = pd.to_numeric(df['surface_reelle_bati'], errors='coerce').round()
+            biens = biens + '|' + surface.astype(str)
+        return biens, eligibles
+
+    def _ajouter_ventes_repetees(self, df, mois, prix, departements):
+        biens, eligibles = self._cles_biens(df)
+        if self.origine is None:
+            self.origine = int(mois.min())
+        t = mois - self.origine
+        # Ventes antérieures à l'origine de l'indice : ignorées
+        garde = eligibles & (t >= 0)
+        if not garde.any():
+            return
+
+        nouvelles = pd.DataFrame({
+            'bien': biens.to_numpy()[garde],
+            't': t[garde],
+            'log_prix': np.log(prix[garde]),
+            'departement': departements[garde],
+            'rang': np.arange(garde.sum()),
+        })
+        etat = self.dernieres_ventes
+        # Ventes plus anciennes que la dernière vente connue du bien : ignorées
+        t_connu = etat['t'].reindex(nouvelles['bien']).to_numpy(dtype=np.float64)
+        nouvelles = nouvelles[~(t_connu > nouvelles['t'].to_numpy())]
+
+        # Dernières ventes connues des biens concernés, placées en tête de
+        # leur bien (rang -1), puis tri par (bien, mois) : chaque vente est
+        # appariée à la précédente du même bien
+        anciennes = etat[etat.index.isin(nouvelles['bien'])].rename_axis('bien').reset_index()
+        anciennes['rang'] = -1
+        toutes = pd.concat([anciennes, nouvelles], ignore_index=True)
+        toutes = toutes.sort_values(['bien', 't', 'rang'], kind='stable', ignore_index=True)
+
+        precedente = toutes.shift()
+        paire = ((toutes['bien'] == precedente['bien']) & (toutes['t'] > precedente['t'])).to_numpy()
+        paires = np.column_stack([
+            precedente['t'].to_numpy(dtype=np.float64)[paire],
+            toutes['t'].to_numpy(dtype=np.float64)[paire],
+            (toutes['log_prix'] - precedente['log_prix']).to_numpy()[paire],
+        ])
+        if len(paires):
+            self._mettre_a_jour_equations(NATIONAL, paires)
+            zones = toutes['departement'].to_numpy()[paire]
+            for zone, idx in pd.Series(np.arange(len(paires))).groupby(zones):
+                self._mettre_a_jour_equations(zone, paires[idx.to_numpy()])
+
+        # Une vente du même mois que la précédente la remplace comme référence
+        dernieres = toutes.drop_duplicates('bien', keep='last').set_index('bien')[['t', 'log_prix']]
+        self.dernieres_ventes = pd.concat([etat[~etat.index.isin(dernieres.index)], dernieres])
+
+    def _mettre_a_jour_equations(self, zone, paires):
+        t0 = paires[:, 0].astype(np.int64)
+        t1 = paires[:, 1].astype(np.int64)
+        dlog = paires[:, 2]
+        n_mois = int(t1.max()) + 1
+
+        xtx, xty = self.equations.get(zone, (np.zeros((0, 0)), np.zeros(0)))
+        if xtx.shape[0] < n_mois:
+            # Agrandissement à l'arrivée de nouveaux mois
+            agrandi = np.zeros((n_mois, n_mois))
+            agrandi[:xtx.shape[0], :xtx.shape[0]] = xtx
+            xty = np.concatenate([xty, np.zeros(n_mois - len(xty))])
+            xtx = agrandi
+
+        # Ligne de régression : -1 au mois de la vente précédente, +1 au mois courant
+        np.add.at(xtx, (t0, t0), 1.0)
+        np.add.at(xtx, (t1, t1), 1.0)
+        np.add.at(xtx, (t0, t1), -1.0)
+        np.add.at(xtx, (t1, t0), -1.0)
+        np.add.at(xty, t1, dlog)
+        np.add.at(xty, t0, -dlog)
+        self.equations[zone] = (xtx, xty)
+
+    def _calculer_fenetre(self, niveau, zone, fin):
+        par_mois = self.valeurs.get((niveau, zone), {})
+        morceaux = [par_mois[m] for m in range(fin - self.fenetre + 1, fin + 1) if m in par_mois]
+        if not morceaux or fin not in par_mois:
+            return None
+        valeurs = np.concatenate(morceaux).astype(np.float64)
+        return {
+            'n_ventes': len(valeurs),
+            'mediane': float(np.median(valeurs)),
+            'moyenne_tronquee': _moyenne_tronquee(valeurs, self.proportion_tronquee),
+        }
+
+    def indices_glissants(self, niveau='commune'):
+        """
+        Moyennes tronquées et médianes glissantes du prix au m² par zone et
+        par mois (seulement pour les mois ayant des ventes). Seules les
+        fenêtres touchées par les derniers ajouts sont recalculées.
+
+        Paramètres
+        ----------
+        niveau : {'commune', 'departement'}
+
+        Retour
+        ------
+        pd.DataFrame
+            Colonnes 'zone', 'mois', 'n_ventes', 'mediane', 'moyenne_tronquee'
+        """
+        for cle in [c for c in self._a_recalculer if c[0] == niveau]:
+            stats = self._calculer_fenetre(*cle)
+            if stats is None:
+                self._statistiques.pop(cle, None)
+            else:
+                self._statistiques[cle] = stats
+            self._a_recalculer.discard(cle)
+
+        lignes = [
+            {'zone': zone, 'mois': _periode(m), **stats}
+            for (n, zone, m), stats in self._statistiques.items() if n == niveau
+        ]
+        colonnes = ['zone', 'mois', 'n_ventes', 'mediane', 'moyenne_tronquee']
+        if not lignes:
+            return pd.DataFrame(columns=colonnes)
+        return pd.DataFrame(lignes, columns=colonnes).sort_values(['zone', 'mois'], ignore_index=True)
+
+    def indice_ventes_repetees(self, zone=NATIONAL, base=100.0):
+        """
+        Indice de ventes répétées pour un département ou pour la France
+        entière, de base `base` au premier mois identifié de la zone.
+
+        Seuls les mois reliés à ce mois de base par une chaîne de paires de
+        ventes sont identifiés ; les autres (sans paire, ou appartenant à un
+        groupe de mois sans lien avec la base) valent NaN.
+
+        Retour
+        ------
+        pd.Series
+            Indice indexé par mois (NaN pour les mois non identifiés)
+        """
+        if zone not in self.equations:
+            raise KeyError(f"Aucune vente répétée pour la zone '{zone}'.")
+        xtx, xty = self.equations[zone]
+        n_mois = len(xty)
+        beta = np.full(n_mois, np.nan)
+
+        # Composantes connexes du graphe des mois reliés par des paires
+        liens = sparse.csr_matrix((xtx != 0) & ~np.eye(n_mois, dtype=bool))
+        _, composante = connected_components(liens, directed=False)
+        avec_paires = np.flatnonzero(np.diag(xtx) > 0)
+        if len(avec_paires):
+            mois_base = avec_paires[0]
+            identifies = np.flatnonzero(composante == composante[mois_base])
+            autres = identifies[identifies != mois_base]
+            beta[mois_base] = 0.0
+            if len(autres):
+                # Mois de base fixé : système de rang plein sur la composante
+                beta[autres] = np.linalg.solve(xtx[np.ix_(autres, autres)], xty[autres])
+
+        index = pd.PeriodIndex([_periode(self.origine + t) for t in range(n_mois)], name='mois')
+        return pd.Series(base * np.exp(beta), index=index, name=f'indice_{zone}')
+
+    def sauvegarder(self, path):
+        """
+        Sauvegarde l'état complet (pickle) pour reprendre les mises à jour.
+        """
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def charger(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
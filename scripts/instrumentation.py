@@ -0,0 +1,275 @@
+from contextlib import contextmanager
+import functools
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import pandas as pd
+
+
+# Modules instrumentés par défaut
+MODULES = [
+    "get_data",
+    "data_clean",
+    "do_ols",
+    "data_analysis",
+    "data_visualization",
+    "getvis",
+]
+
+_etat = {"actif": False, "memoire": False, "tracemalloc_demarre": False}
+_traces = []
+_verrou = threading.Lock()
+_local = threading.local()
+_originaux = {}
+# Liaisons remplacées dans des espaces de noms appelants : (globals, nom, originale)
+_liaisons = []
+
+
+def _nb_lignes(valeur):
+    if isinstance(valeur, (pd.DataFrame, pd.Series)):
+        return len(valeur)
+    return None
+
+
+def instrumenter(fonction):
+    """
+    Décorateur enregistrant, quand l'instrumentation est active, le temps
+    réel, le temps CPU, le pic mémoire (tracemalloc) et le nombre de lignes
+    en entrée/sortie de chaque appel. Inactif, il appelle directement la
+    fonction.
+    """
+    if getattr(fonction, "_instrumentee", False):
+        return fonction
+
+    @functools.wraps(fonction)
+    def enveloppe(*args, **kwargs):
+        if not _etat["actif"]:
+            return fonction(*args, **kwargs)
+
+        pile = getattr(_local, "pile", None)
+        if pile is None:
+            pile = _local.pile = []
+        parent = pile[-1] if pile else None
+
+        memoire = _etat["memoire"] and tracemalloc.is_tracing()
+        if memoire:
+            courant, pic = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent["pic"] = max(parent["pic"], pic)
+            tracemalloc.reset_peak()
+        else:
+            courant = 0
+
+        lignes = [n for n in map(_nb_lignes, list(args) + list(kwargs.values())) if n is not None]
+        cadre = {"nom": fonction.__qualname__, "memoire_debut": courant, "pic": 0}
+        pile.append(cadre)
+        debut = time.perf_counter()
+        debut_cpu = time.thread_time()
+        try:
+            resultat = fonction(*args, **kwargs)
+        finally:
+            duree = time.perf_counter() - debut
+            duree_cpu = time.thread_time() - debut_cpu
+            pile.pop()
+            pic = None
+            if memoire:
+                cadre["pic"] = max(cadre["pic"], tracemalloc.get_traced_memory()[1])
+                pic = (cadre["pic"] - cadre["memoire_debut"]) / 1e6
+                if parent is not None:
+                    parent["pic"] = max(parent["pic"], cadre["pic"])
+
+        trace = {
+            "fonction": fonction.__qualname__,
+            "module": fonction.__module__,
+            "pile": ";".join([c["nom"] for c in pile] + [fonction.__qualname__]),
+            "thread": threading.get_ident(),
+            "debut_s": debut,
+            "duree_s": duree,
+            "cpu_s": duree_cpu,
+            "pic_memoire_mo": pic,
+            "lignes_entree": sum(lignes) if lignes else None,
+            "lignes_sortie": _nb_lignes(resultat),
+        }
+        with _verrou:
+            _traces.append(trace)
+        return resultat
+
+    enveloppe._instrumentee = True
+    return enveloppe
+
+
+def _fonctions_du_module(module):
+    for nom, objet in vars(module).items():
+        if (callable(objet) and not nom.startswith("_")
+                and getattr(objet, "__module__", None) == module.__name__
+                and not isinstance(objet, type)):
+            yield nom, objet
+
+
+def activer_instrumentation(modules=MODULES, memoire=True, namespace=None):
+    """
+    Active l'instrumentation des fonctions publiques des modules de
+    `scripts` (dans les modules et dans l'espace de noms du paquet).
+
+    Les noms déjà importés ailleurs (ex : `from scripts import *` dans le
+    notebook) restent liés aux fonctions d'origine : passer `globals()` en
+    `namespace` pour les instrumenter aussi, ou appeler les fonctions par
+    leur nom qualifié (`scripts.troncature_lots(...)`).
+
+    Paramètres
+    ----------
+    modules : list
+        Noms des modules de `scripts` à instrumenter
+    memoire : bool
+        Mesurer le pic mémoire avec tracemalloc (ralentit l'exécution)
+    namespace : dict, optional
+        Espace de noms de l'appelant (typiquement `globals()`) dont les
+        fonctions importées sont remplacées le temps de l'instrumentation
+    """
+    paquet = sys.modules[__package__]
+    enveloppes = {}
+    for nom_module in modules:
+        module = importlib.import_module(f"{__package__}.{nom_module}")
+        for nom, fonction in list(_fonctions_du_module(module)):
+            if getattr(fonction, "_instrumentee", False):
+                continue
+            enveloppe = instrumenter(fonction)
+            _originaux[(module.__name__, nom)] = fonction
+            enveloppes[id(fonction)] = enveloppe
+            setattr(module, nom, enveloppe)
+            if getattr(paquet, nom, None) is fonction:
+                setattr(paquet, nom, enveloppe)
+
+    if namespace is not None:
+        for nom, objet in list(namespace.items()):
+            if id(objet) in enveloppes:
+                namespace[nom] = enveloppes[id(objet)]
+                _liaisons.append((namespace, nom, objet))
+
+    _etat["memoire"] = memoire
+    if memoire and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _etat["tracemalloc_demarre"] = True
+    _etat["actif"] = True
+
+
+def desactiver_instrumentation():
+    """
+    Désactive l'instrumentation et restaure les fonctions d'origine (y
+    compris dans l'espace de noms passé à `activer_instrumentation`).
+    """
+    _etat["actif"] = False
+    paquet = sys.modules[__package__]
+    for (nom_module, nom), fonction in _originaux.items():
+        module = sys.modules[nom_module]
+        enveloppe = getattr(module, nom)
+        setattr(module, nom, fonction)
+        if getattr(paquet, nom, None) is enveloppe:
+            setattr(paquet, nom, fonction)
+    _originaux.clear()
+    for namespace, nom, fonction in _liaisons:
+        if getattr(namespace.get(nom), "_instrumentee", False):
+            namespace[nom] = fonction
+    _liaisons.clear()
+    # tracemalloc n'est arrêté que s'il a été démarré ici (un traçage déjà
+    # en cours avant `profiler()` continue)
+    if _etat["tracemalloc_demarre"] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _etat["tracemalloc_demarre"] = False
+
+
+def traces():
+    """
+    Renvoie les appels enregistrés sous forme de DataFrame.
+    """
+    with _verrou:
+        return pd.DataFrame(list(_traces))
+
+
+def reinitialiser_traces():
+    with _verrou:
+        _traces.clear()
+
+
+def exporter_json(path):
+    """
+    Exporte les traces brutes en JSON (une entrée par appel).
+    """
+    with _verrou:
+        donnees = list(_traces)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(donnees, f, ensure_ascii=False, indent=2)
+
+
+def exporter_chrome_trace(path):
+    """
+    Exporte les traces au format Chrome Trace Event, lisible par
+    chrome://tracing, Perfetto ou speedscope (vue flamegraph).
+    """
+    with _verrou:
+        donnees = list(_traces)
+    origine = min((t["debut_s"] for t in donnees), default=0.0)
+    evenements = [{
+        "name": t["fonction"],
+        "cat": t["module"],
+        "ph": "X",
+        "ts": (t["debut_s"] - origine) * 1e6,
+        "dur": t["duree_s"] * 1e6,
+        "pid": os.getpid(),
+        "tid": t["thread"],
+        "args": {k: t[k] for k in ("cpu_s", "pic_memoire_mo", "lignes_entree", "lignes_sortie")},
+    } for t in donnees]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": evenements, "displayTimeUnit": "ms"}, f)
+
+
+def exporter_piles_repliees(path):
+    """
+    Exporte les traces en piles repliées (« collapsed stacks ») pour
+    flamegraph.pl ou speedscope : une ligne par pile, pondérée par le temps
+    propre en microsecondes.
+    """
+    df = traces()
+    if df.empty:
+        open(path, "w").close()
+        return
+    totaux = df.groupby("pile")["duree_s"].sum()
+    # Temps propre : temps total moins celui des appels enfants directs
+    parents = totaux.index.str.rsplit(";", n=1).str[0]
+    enfants = pd.Series(totaux.to_numpy(), index=parents)
+    enfants = enfants[enfants.index.isin(totaux.index) & (parents != totaux.index)]
+    propre = totaux.sub(enfants.groupby(level=0).sum(), fill_value=0).clip(lower=0)
+    with open(path, "w", encoding="utf-8") as f:
+        for pile, duree in propre.items():
+            f.write(f"{pile} {int(round(duree * 1e6))}\n")
+
+
+@contextmanager
+def profiler(modules=MODULES, memoire=True, namespace=None):
+    """
+    Active l'instrumentation le temps d'un bloc et renvoie les traces.
+
+    Après `from scripts import *`, passer `namespace=globals()` pour que
+    les noms importés soient instrumentés (sinon, seuls les appels
+    qualifiés comme `scripts.troncature_lots(...)` sont tracés).
+
+    Exemple
+    -------
+    with profiler(namespace=globals()) as p:
+        df2 = troncature_lots(df_sans_lots)
+    p.traces
+    """
+    resultat = SimpleNamespace(traces=None)
+    reinitialiser_traces()
+    activer_instrumentation(modules, memoire, namespace)
+    try:
+        yield resultat
+    finally:
+        desactiver_instrumentation()
+        resultat.traces = traces()
@@ -0,0 +1,279 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import numba
+except ImportError:  # numba est optionnel : repli sur numpy
+    numba = None
+
+
+COLONNES_DESCRIBE = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+# Accélération minimale attendue d'un noyau par rapport au calcul pandas
+# équivalent (vérifiée par `benchmark.verifier_objectifs`) avant de
+# l'utiliser dans les fonctions d'analyse
+OBJECTIF_ACCELERATION = 2.0
+
+
+class GroupesTries:
+    """
+    Valeurs triées une seule fois par (groupe, valeur), point de départ de
+    toutes les statistiques par groupe (réductions par segment).
+
+    Le tri n'est effectué qu'à la première statistique qui en a besoin
+    (quantiles, min/max, moyenne tronquée) : effectifs, sommes, moyennes et
+    écarts-types se calculent directement par `np.bincount`.
+
+    Paramètres
+    ----------
+    codes : np.ndarray
+        Code entier du groupe de chaque valeur (-1 : ignorée)
+    valeurs : np.ndarray
+        Valeurs (les NaN sont ignorés, comme dans pandas)
+    n_groupes : int, optional
+        Nombre de groupes (par défaut codes.max() + 1)
+    """
+
+    def __init__(self, codes, valeurs, n_groupes=None):
+        codes = np.asarray(codes)
+        valeurs = np.asarray(valeurs, dtype=np.float64)
+        if n_groupes is None:
+            n_groupes = int(codes.max()) + 1 if len(codes) else 0
+        self.n_groupes = n_groupes
+
+        garde = (codes >= 0) & ~np.isnan(valeurs)
+        self.codes = codes[garde].astype(np.intp, copy=False)
+        self.valeurs = valeurs[garde]
+        self.effectifs = np.bincount(self.codes, minlength=n_groupes)
+        self.bornes = np.concatenate([[0], np.cumsum(self.effectifs)])
+        self._trie = False
+
+    def _trier(self):
+        """
+        Tri par (groupe, valeur) : tri des valeurs, puis tri stable des
+        codes (tri par base, en O(n), quand les codes tiennent sur 16 bits).
+        """
+        if self._trie:
+            return
+        ordre = np.argsort(self.valeurs)
+        petits = np.int16 if self.n_groupes <= np.iinfo(np.int16).max else np.int32
+        ordre = ordre[np.argsort(self.codes[ordre].astype(petits), kind='stable')]
+        self.codes = self.codes[ordre]
+        self.valeurs = self.valeurs[ordre]
+        self._trie = True
+
+    def somme(self):
+        return np.bincount(self.codes, weights=self.valeurs, minlength=self.n_groupes)
+
+    def moyenne(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.somme() / self.effectifs
+
+    def ecart_type(self, ddof=1):
+        moyenne = self.moyenne()
+        ecarts = (self.valeurs - moyenne[self.codes]) ** 2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = np.bincount(self.codes, weights=ecarts, minlength=self.n_groupes) / (self.effectifs - ddof)
+        return np.where(self.effectifs > ddof, np.sqrt(variance), np.nan)
+
+    def minimum(self):
+        return self._extremite(self.bornes[:-1])
+
+    def maximum(self):
+        return self._extremite(self.bornes[1:] - 1)
+
+    def _extremite(self, positions):
+        self._trier()
+        resultat = np.full(self.n_groupes, np.nan)
+        non_vides = self.effectifs > 0
+        resultat[non_vides] = self.valeurs[positions[non_vides]]
+        return resultat
+
+    def quantiles(self, q):
+        """
+        Quantiles par groupe, interpolation linéaire (méthode par défaut de
+        pandas et numpy).
+
+        Retour
+        ------
+        np.ndarray
+            Tableau (n_groupes, len(q)), NaN pour les groupes vides
+        """
+        self._trier()
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        non_vides = self.effectifs > 0
+        n = self.effectifs[non_vides][:, None]
+        debut = self.bornes[:-1][non_vides][:, None]
+
+        position = (n - 1) * q[None, :]
+        bas = np.floor(position).astype(np.int64)
+        haut = np.minimum(bas + 1, n - 1)
+        fraction = position - bas
+        v_bas = self.valeurs[debut + bas]
+        v_haut = self.valeurs[debut + haut]
+
+        resultat = np.full((self.n_groupes, len(q)), np.nan)
+        resultat[non_vides] = v_bas + (v_haut - v_bas) * fraction
+        return resultat
+
+    def mediane(self):
+        return self.quantiles(0.5)[:, 0]
+
+    def moyenne_tronquee(self, bas=0.025, haut=0.975):
+        """
+        Moyenne des valeurs strictement comprises entre les quantiles `bas`
+        et `haut` de leur groupe (règle de `troncature_lots`).
+        """
+        self._trier()
+        if numba is not None:
+            return _moyenne_tronquee_jit(self.valeurs, self.bornes, bas, haut)
+        masque = self.masque_troncature(bas, haut)
+        somme = np.bincount(self.codes[masque], weights=self.valeurs[masque], minlength=self.n_groupes)
+        effectif = np.bincount(self.codes[masque], minlength=self.n_groupes)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return somme / effectif
+
+    def masque_troncature(self, bas=0.025, haut=0.975):
+        """
+        Masque (dans l'ordre trié) des valeurs strictement comprises entre
+        les quantiles `bas` et `haut` de leur groupe.
+        """
+        bornes = self.quantiles([bas, haut])
+        return (self.valeurs > bornes[self.codes, 0]) & (self.valeurs < bornes[self.codes, 1])
+
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _quantile_segment(valeurs, debut, n, q):
+        position = (n - 1) * q
+        bas = int(np.floor(position))
+        haut = min(bas + 1, n - 1)
+        return valeurs[debut + bas] + (valeurs[debut + haut] - valeurs[debut + bas]) * (position - bas)
+
+    @numba.njit(cache=True)
+    def _moyenne_tronquee_jit(valeurs, bornes, bas, haut):
+        n_groupes = len(bornes) - 1
+        resultat = np.full(n_groupes, np.nan)
+        for g in range(n_groupes):
+            debut, fin = bornes[g], bornes[g + 1]
+            n = fin - debut
+            if n == 0:
+                continue
+            q_bas = _quantile_segment(valeurs, debut, n, bas)
+            q_haut = _quantile_segment(valeurs, debut, n, haut)
+            somme, effectif = 0.0, 0
+            for i in range(debut, fin):
+                if q_bas < valeurs[i] < q_haut:
+                    somme += valeurs[i]
+                    effectif += 1
+            if effectif > 0:
+                resultat[g] = somme / effectif
+        return resultat
+
+
+def statistiques_groupees(codes, valeurs, n_groupes=None, quantiles=(0.25, 0.5, 0.75),
+                          troncature=(0.025, 0.975)):
+    """
+    Calcule en une fois, à partir d'un seul tri, les statistiques par
+    groupe : effectif, somme, moyenne, écart-type, min, max, quantiles et
+    moyenne tronquée.
+
+    Paramètres
+    ----------
+    codes : np.ndarray
+        Code entier du groupe de chaque valeur (-1 : ignorée)
+    valeurs : np.ndarray
+        Valeurs numériques
+    n_groupes : int, optional
+        Nombre de groupes
+    quantiles : tuple
+        Quantiles à calculer
+    troncature : tuple | None
+        Quantiles (bas, haut) de la moyenne tronquée (None pour l'omettre)
+
+    Retour
+    ------
+    pd.DataFrame
+        Une ligne par code de groupe (0 à n_groupes - 1)
+    """
+    groupes = GroupesTries(codes, valeurs, n_groupes)
+    resultat = {
+        'count': groupes.effectifs.astype(np.float64),
+        'sum': groupes.somme(),
+        'mean': groupes.moyenne(),
+        'std': groupes.ecart_type(),
+        'min': groupes.minimum(),
+        'max': groupes.maximum(),
+    }
+    if quantiles:
+        valeurs_q = groupes.quantiles(quantiles)
+        for i, q in enumerate(quantiles):
+            resultat[f'{q * 100:g}%'] = valeurs_q[:, i]
+    if troncature is not None:
+        resultat['moyenne_tronquee'] = groupes.moyenne_tronquee(*troncature)
+    return pd.DataFrame(resultat)
+
+
+def _codes(cles):
+    """
+    Codes entiers des groupes (ordre d'apparition, sans tri des clés) et
+    ordre de tri des clés uniques, pour présenter les résultats comme
+    pandas (groupes triés).
+    """
+    codes, uniques = pd.factorize(cles, sort=False)
+    return codes, uniques, np.argsort(uniques, kind='stable')
+
+
+def agregation_groupee(df, cle, colonne, agg='median'):
+    """
+    Équivalent de df.groupby(cle, as_index=False)[colonne].agg(agg) pour
+    agg parmi 'mean', 'median', 'sum', 'count', 'min', 'max', 'std' et
+    'moyenne_tronquee'.
+    """
+    codes, uniques, ordre = _codes(df[cle])
+    groupes = GroupesTries(codes, df[colonne].to_numpy(dtype=np.float64), len(uniques))
+    fonctions = {
+        'mean': groupes.moyenne,
+        'median': groupes.mediane,
+        'sum': groupes.somme,
+        'count': lambda: groupes.effectifs,
+        'min': groupes.minimum,
+        'max': groupes.maximum,
+        'std': groupes.ecart_type,
+        'moyenne_tronquee': groupes.moyenne_tronquee,
+    }
+    if agg not in fonctions:
+        raise ValueError(f"agg non supporté : {agg}")
+    return pd.DataFrame({cle: uniques[ordre], colonne: fonctions[agg]()[ordre]})
+
+
+def decrire_groupes(df, cle, colonne):
+    """
+    Équivalent de df.groupby(cle)[colonne].describe() calculé à partir d'un
+    seul tri des valeurs.
+    """
+    codes, uniques, ordre = _codes(df[cle])
+    stats = statistiques_groupees(codes, df[colonne].to_numpy(dtype=np.float64), len(uniques),
+                                  troncature=None)
+    stats = stats.iloc[ordre]
+    stats.index = pd.Index(uniques[ordre], name=cle)
+    return stats[COLONNES_DESCRIBE]
+
+
+def masque_troncature_lignes(cles, valeurs, bas=0.025, haut=0.975):
+    """
+    Pour chaque ligne, les quantiles `bas`/`haut` de son groupe et le
+    masque des valeurs strictement comprises entre eux (dans l'ordre des
+    lignes d'origine).
+
+    Retour
+    ------
+    tuple (np.ndarray, np.ndarray, np.ndarray)
+        Quantile bas, quantile haut (NaN si groupe inconnu) et masque
+    """
+    codes, uniques, _ = _codes(cles)
+    valeurs = np.asarray(valeurs, dtype=np.float64)
+    bornes = GroupesTries(codes, valeurs, len(uniques)).quantiles([bas, haut])
+    bornes = np.vstack([bornes, [np.nan, np.nan]])  # code -1 -> NaN
+    q_bas, q_haut = bornes[codes, 0], bornes[codes, 1]
+    return q_bas, q_haut, (valeurs > q_bas) & (valeurs < q_haut)
@@ -0,0 +1,243 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import inspect
+import os
+import pickle
+import tempfile
+
+import pandas as pd
+
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'Données', 'cache', 'pipeline')
+
+
+def _hacher(valeur):
+    """
+    Empreinte stable d'un paramètre : les DataFrame/Series sont hachés par
+    contenu, les autres objets via pickle.
+    """
+    if isinstance(valeur, (pd.DataFrame, pd.Series)):
+        h = hashlib.sha256()
+        h.update(repr(list(getattr(valeur, "columns", [valeur.name]))).encode())
+        h.update(pd.util.hash_pandas_object(valeur, index=True).to_numpy().tobytes())
+        return h.hexdigest()
+    if isinstance(valeur, dict):
+        return _hacher(sorted((str(k), _hacher(v)) for k, v in valeur.items()))
+    if isinstance(valeur, (list, tuple)):
+        return _hacher(pickle.dumps([_hacher(v) for v in valeur]))
+    return hashlib.sha256(pickle.dumps(valeur)).hexdigest()
+
+
+def _empreinte_fonction(fonction):
+    """
+    Empreinte d'une fonction : nom qualifié et code source, de sorte qu'une
+    modification du code invalide les résultats en cache.
+    """
+    try:
+        source = inspect.getsource(fonction)
+    except (OSError, TypeError):
+        source = ""
+    nom = f"{getattr(fonction, '__module__', '')}.{getattr(fonction, '__qualname__', repr(fonction))}"
+    return hashlib.sha256((nom + source).encode()).hexdigest()
+
+
+class Etape:
+    """
+    Étape du pipeline : une fonction de `scripts`, les étapes dont les
+    résultats lui sont passés en arguments positionnels, et ses paramètres
+    nommés.
+    """
+
+    def __init__(self, nom, fonction, entrees=(), params=None, copier_entrees=False):
+        self.nom = nom
+        self.fonction = fonction
+        self.entrees = list(entrees)
+        self.params = dict(params or {})
+        # À activer pour les fonctions qui modifient leurs arguments en place
+        # (ex : convertir_codes_communes)
+        self.copier_entrees = copier_entrees
+
+
+class Pipeline:
+    """
+    Chaîne de traitements (graphe orienté acyclique) avec cache sur disque.
+
+    L'empreinte de chaque étape combine le code de sa fonction, ses
+    paramètres et les empreintes des étapes amont : modifier un paramètre
+    d'une carte ne recalcule que cette carte, les étapes amont étant relues
+    depuis le cache.
+
+    Paramètres
+    ----------
+    cache_dir : str
+        Dossier du cache des résultats (par défaut Données/cache/pipeline du
+        dépôt, quel que soit le dossier courant)
+    n_jobs : int
+        Nombre d'étapes indépendantes exécutées simultanément
+
+    Exemple
+    -------
+    p = Pipeline()
+    p.etape("dvf", get_cloud_csv, filename="dvf")
+    p.etape("dvf_codes", convertir_codes_communes, "dvf", copier_entrees=True)
+    p.etape("communes", get_local_csv, filename="liste_communes")
+    p.etape("sans_lots", construire_df_sans_lots, "dvf_codes")
+    p.etape("tronque", troncature_lots, "sans_lots")
+    p.etape("avec_noms", ajout_non_communes, "tronque", "communes")
+    p.etape("carte_prix", carte_choropleth_departements_prix_m2, "avec_noms", agg="median")
+    carte = p.executer("carte_prix")
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, n_jobs=1):
+        self.cache_dir = cache_dir
+        self.n_jobs = n_jobs
+        self.etapes = {}
+        self.journal = []
+
+    def etape(self, nom, fonction, *entrees, copier_entrees=False, **params):
+        """
+        Déclare une étape. Les `entrees` sont des noms d'étapes déjà
+        déclarées, les `params` sont passés tels quels à la fonction.
+        """
+        inconnues = [e for e in entrees if e not in self.etapes]
+        if inconnues:
+            raise KeyError(f"Étapes amont inconnues pour '{nom}' : {inconnues}")
+        self.etapes[nom] = Etape(nom, fonction, entrees, params, copier_entrees)
+        return self
+
+    def empreinte(self, nom, _memo=None):
+        """
+        Calcule l'empreinte d'une étape (sans exécuter le pipeline).
+        """
+        memo = {} if _memo is None else _memo
+        if nom not in memo:
+            etape = self.etapes[nom]
+            h = hashlib.sha256()
+            h.update(_empreinte_fonction(etape.fonction).encode())
+            h.update(_hacher(etape.params).encode())
+            for entree in etape.entrees:
+                h.update(self.empreinte(entree, memo).encode())
+            memo[nom] = h.hexdigest()
+        return memo[nom]
+
+    def _chemin_cache(self, nom, empreinte):
+        return os.path.join(self.cache_dir, f"{nom}_{empreinte[:16]}.pkl")
+
+    def _ancetres(self, cibles):
+        """
+        Étapes nécessaires aux cibles, dans un ordre topologique.
+        """
+        ordre, vus = [], set()
+
+        def visiter(nom):
+            if nom in vus:
+                return
+            vus.add(nom)
+            for entree in self.etapes[nom].entrees:
+                visiter(entree)
+            ordre.append(nom)
+
+        for cible in cibles:
+            visiter(cible)
+        return ordre
+
+    def invalides(self, cibles=None):
+        """
+        Liste les étapes qui seraient recalculées (absentes du cache).
+        """
+        cibles = list(self.etapes) if cibles is None else list(cibles)
+        memo = {}
+        return [
+            nom for nom in self._ancetres(cibles)
+            if not os.path.exists(self._chemin_cache(nom, self.empreinte(nom, memo)))
+        ]
+
+    def _calculer(self, etape, entrees):
+        if etape.copier_entrees:
+            entrees = [e.copy() if hasattr(e, "copy") else e for e in entrees]
+        return etape.fonction(*entrees, **etape.params)
+
+    def executer(self, cibles=None, forcer=()):
+        """
+        Exécute les étapes nécessaires aux cibles en réutilisant le cache.
+
+        Paramètres
+        ----------
+        cibles : str | list, optional
+            Étape(s) à obtenir (par défaut toutes)
+        forcer : list
+            Étapes à recalculer même si elles sont en cache (les empreintes
+            ne dépendant pas des données produites, les étapes aval en cache
+            ne sont pas recalculées)
+
+        Retour
+        ------
+        Résultat de la cible si `cibles` est une chaîne, sinon dictionnaire
+        {nom: résultat}
+        """
+        unique = isinstance(cibles, str)
+        cibles = [cibles] if unique else (list(self.etapes) if cibles is None else list(cibles))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        memo = {}
+        ordre = self._ancetres(cibles)
+        empreintes = {nom: self.empreinte(nom, memo) for nom in ordre}
+        a_calculer = {
+            nom for nom in ordre
+            if nom in forcer or not os.path.exists(self._chemin_cache(nom, empreintes[nom]))
+        }
+
+        resultats = {}
+
+        def obtenir(nom):
+            # Résultat en mémoire, sinon relu depuis le cache
+            if nom not in resultats:
+                with open(self._chemin_cache(nom, empreintes[nom]), "rb") as f:
+                    resultats[nom] = pickle.load(f)
+                self.journal.append((nom, "cache"))
+            return resultats[nom]
+
+        def executer_etape(nom, entrees):
+            resultat = self._calculer(self.etapes[nom], entrees)
+            # Écriture dans un fichier temporaire puis renommage : un échec de
+            # sérialisation ou une interruption ne laisse pas de cache tronqué
+            descripteur, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{nom}_", suffix=".tmp")
+            try:
+                with os.fdopen(descripteur, "wb") as f:
+                    pickle.dump(resultat, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self._chemin_cache(nom, empreintes[nom]))
+            except BaseException:
+                os.remove(tmp)
+                raise
+            return resultat
+
+        # Regroupement par niveaux : les étapes d'un même niveau sont
+        # indépendantes et peuvent s'exécuter en parallèle
+        niveau = {}
+        for nom in ordre:
+            amont = [niveau[e] for e in self.etapes[nom].entrees if e in a_calculer]
+            niveau[nom] = 1 + max(amont, default=-1) if nom in a_calculer else -1
+        niveaux = sorted({n for n in niveau.values() if n >= 0})
+
+        with ThreadPoolExecutor(max_workers=self.n_jobs) as executor:
+            for n in niveaux:
+                lot = [nom for nom in ordre if niveau[nom] == n]
+                entrees = {nom: [obtenir(e) for e in self.etapes[nom].entrees] for nom in lot}
+                futurs = {nom: executor.submit(executer_etape, nom, entrees[nom]) for nom in lot}
+                for nom, futur in futurs.items():
+                    resultats[nom] = futur.result()
+                    self.journal.append((nom, "calcul"))
+
+        sortie = {nom: obtenir(nom) for nom in cibles}
+        return sortie[cibles[0]] if unique else sortie
+
+    def vider_cache(self):
+        """
+        Supprime les résultats en cache des étapes déclarées.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+        prefixes = tuple(f"{nom}_" for nom in self.etapes)
+        for fichier in os.listdir(self.cache_dir):
+            if fichier.endswith(".pkl") and fichier.startswith(prefixes):
+                os.remove(os.path.join(self.cache_dir, fichier))
@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+from .global_variables import var_explicative_modeles
+
+
+def _normaliser_codes(codes):
+    """
+    Codes communes en texte sur 5 caractères : les codes lus comme nombres
+    (ex : 1001 ou 1001.0 pour '01001') retrouvent leur zéro initial.
+    """
+    codes = pd.Series(np.asarray(codes).ravel()).astype(str).str.replace(r'\.0$', '', regex=True)
+    return codes.str.zfill(5).to_numpy(dtype=str)
+
+
+class FeatureStore:
+    """
+    Variables explicatives de la régression, indexées par code commune et
+    stockées dans un tableau float32 contigu (une ligne par commune).
+
+    Paramètres
+    ----------
+    codes : array-like
+        Codes communes (INSEE), dans l'ordre des lignes de `valeurs`
+    variables : list
+        Noms des colonnes de `valeurs`
+    valeurs : np.ndarray
+        Tableau (n_communes, n_variables)
+    """
+
+    def __init__(self, codes, variables, valeurs):
+        self.codes = np.asarray(codes, dtype=str)
+        self.variables = list(variables)
+        self.valeurs = np.ascontiguousarray(valeurs, dtype=np.float32)
+        if self.valeurs.shape != (len(self.codes), len(self.variables)):
+            raise ValueError("Dimensions incohérentes entre codes, variables et valeurs.")
+        # Table de hachage code commune -> ligne, construite une seule fois
+        self._index = pd.Index(self.codes)
+        if not self._index.is_unique:
+            raise ValueError("Les codes communes doivent être uniques.")
+
+    @classmethod
+    def depuis_dossier_complet(cls, dossier_complet, variables=var_explicative_modeles,
+                               colonne_code='CODGEO'):
+        """
+        Construit le store à partir du dossier complet INSEE.
+
+        Paramètres
+        ----------
+        dossier_complet : pd.DataFrame
+            Dossier complet, avec la colonne `colonne_code` ou indexé par
+            code commune
+        variables : list
+            Variables à conserver (par défaut l'union des variables
+            explicatives des modèles maisons et appartements)
+        colonne_code : str
+            Nom de la colonne du code commune
+
+        Retour
+        ------
+        FeatureStore
+        """
+        if colonne_code in dossier_complet.columns:
+            dossier_complet = dossier_complet.set_index(colonne_code)
+        manquantes = [v for v in variables if v not in dossier_complet.columns]
+        if manquantes:
+            raise KeyError(f"Colonnes absentes du dossier complet : {manquantes}")
+
+        df = dossier_complet[list(variables)]
+        codes = _normaliser_codes(df.index)
+        garde = ~pd.Index(codes).duplicated(keep='first')
+        valeurs = df[garde].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float32)
+        return cls(codes[garde], variables, valeurs)
+
+    def sauvegarder(self, path):
+        """
+        Sauvegarde le store dans un fichier .npz non compressé.
+        """
+        np.savez(path, codes=self.codes, variables=np.asarray(self.variables), valeurs=self.valeurs)
+
+    @classmethod
+    def charger(cls, path):
+        """
+        Charge un store sauvegardé avec `sauvegarder`.
+        """
+        with np.load(path, allow_pickle=False) as f:
+            return cls(f['codes'], list(f['variables']), f['valeurs'])
+
+    def positions(self, codes):
+        """
+        Renvoie la ligne de chaque code commune dans le store (-1 si absent).
+        """
+        return self._index.get_indexer(_normaliser_codes(codes))
+
+    def lookup(self, codes, variables=None):
+        """
+        Récupère en lot les variables des communes demandées.
+
+        Paramètres
+        ----------
+        codes : array-like
+            Codes communes
+        variables : list, optional
+            Sous-ensemble ordonné de variables (par défaut toutes)
+
+        Retour
+        ------
+        np.ndarray
+            Tableau (len(codes), n_variables), NaN pour les communes absentes
+        """
+        pos = self.positions(codes)
+        if variables is None:
+            valeurs = self.valeurs
+        else:
+            valeurs = self.valeurs[:, [self.variables.index(v) for v in variables]]
+        resultat = valeurs[np.where(pos >= 0, pos, 0)]
+        resultat[pos < 0] = np.nan
+        return resultat
+
+    def __len__(self):
+        return len(self.codes)
+
+
+class PredicteurPrixM2:
+    """
+    Prédit le prix au m² de communes à partir d'une régression log-OLS
+    (`run_log_ols_regression`) et d'un `FeatureStore`.
+
+    Paramètres
+    ----------
+    model : statsmodels.regression.linear_model.RegressionResults
+        Régression log-OLS ajustée (avec constante 'const')
+    store : FeatureStore
+        Variables explicatives par commune
+    """
+
+    def __init__(self, model, store):
+        params = model.params
+        self.intercept = float(params.get('const', 0.0))
+        self.variables = [v for v in params.index if v != 'const']
+        manquantes = [v for v in self.variables if v not in store.variables]
+        if manquantes:
+            raise KeyError(f"Variables du modèle absentes du store : {manquantes}")
+        self.beta = params[self.variables].to_numpy(dtype=np.float64)
+        self.store = store
+        # Sous-tableau contigu des variables du modèle, dans l'ordre des coefficients
+        colonnes = [store.variables.index(v) for v in self.variables]
+        self._valeurs = np.ascontiguousarray(store.valeurs[:, colonnes])
+
+    def predict(self, codes, taille_lot=100_000):
+        """
+        Prédit le prix au m² pour une liste de codes communes.
+
+        Paramètres
+        ----------
+        codes : array-like | str
+            Code(s) commune(s)
+        taille_lot : int
+            Nombre de communes traitées par lot (borne la mémoire utilisée)
+
+        Retour
+        ------
+        pd.Series
+            Prix au m² prédit, indexé par code commune (NaN si la commune est
+            absente du store ou a des variables manquantes)
+        """
+        codes = _normaliser_codes(np.atleast_1d(codes))
+        pos = self.store.positions(codes)
+        prix = np.full(len(codes), np.nan)
+
+        for debut in range(0, len(codes), taille_lot):
+            p = pos[debut:debut + taille_lot]
+            trouves = p >= 0
+            log_prix = self._valeurs[p[trouves]] @ self.beta + self.intercept
+            prix[debut:debut + taille_lot][trouves] = np.exp(log_prix)
+
+        return pd.Series(prix, index=pd.Index(codes, name='code_commune'), name='prix_m2_predit')
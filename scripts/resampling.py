@@ -0,0 +1,276 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from .do_ols import aligner_donnees_log_ols
+from .get_data import extract_departement
+
+
+# Nombre de répliques bootstrap par lot (un générateur aléatoire par lot)
+TAILLE_LOT_BOOTSTRAP = 50
+
+
+@dataclass
+class BlocsOLS:
+    """
+    Statistiques suffisantes de la régression log-OLS, précalculées par bloc
+    (département par défaut).
+
+    Attributs
+    ---------
+    noms : list
+        Noms des blocs (codes département)
+    variables : list
+        Noms des variables explicatives (constante incluse)
+    xtx : np.ndarray
+        Matrices X'X par bloc, de forme (G, p, p)
+    xty : np.ndarray
+        Vecteurs X'y par bloc, de forme (G, p)
+    yty : np.ndarray
+        Sommes des y² par bloc, de forme (G,)
+    somme_y : np.ndarray
+        Sommes des y par bloc, de forme (G,)
+    n : np.ndarray
+        Nombre d'observations par bloc, de forme (G,)
+    """
+    noms: list
+    variables: list
+    xtx: np.ndarray
+    xty: np.ndarray
+    yty: np.ndarray
+    somme_y: np.ndarray
+    n: np.ndarray
+
+
+def precalculer_blocs(y, X, blocs=None):
+    """
+    Aligne les données comme `run_log_ols_regression` puis calcule, pour
+    chaque bloc, X'X, X'y, y'y, la somme des y et l'effectif.
+
+    Paramètres
+    ----------
+    y : pd.Series
+        Variable dépendante (strictement positive), indexée par code commune
+    X : pd.DataFrame
+        Variables explicatives, indexées par code commune
+    blocs : pd.Series, optional
+        Identifiant de bloc indexé comme X. Par défaut, le département
+        extrait du code commune de l'index.
+
+    Retour
+    ------
+    BlocsOLS
+        Statistiques par bloc
+    """
+    y_aligned, X_aligned = aligner_donnees_log_ols(y, X)
+
+    if blocs is None:
+        blocs = pd.Series(X_aligned.index.map(extract_departement), index=X_aligned.index)
+    else:
+        if not blocs.index.is_unique:
+            blocs = blocs.groupby(level=0).first()
+        blocs = blocs.reindex(X_aligned.index)
+        if blocs.isna().any():
+            raise ValueError("Certaines observations n'ont pas de bloc associé.")
+
+    codes, noms = pd.factorize(blocs, sort=True)
+    ordre = np.argsort(codes, kind='stable')
+    codes = codes[ordre]
+    Xs = X_aligned.to_numpy(dtype=np.float64)[ordre]
+    ys = y_aligned.to_numpy(dtype=np.float64)[ordre]
+
+    n_blocs, p = len(noms), Xs.shape[1]
+    bornes = np.searchsorted(codes, np.arange(n_blocs + 1))
+
+    xtx = np.empty((n_blocs, p, p))
+    xty = np.empty((n_blocs, p))
+    for g in range(n_blocs):
+        Xg = Xs[bornes[g]:bornes[g + 1]]
+        yg = ys[bornes[g]:bornes[g + 1]]
+        xtx[g] = Xg.T @ Xg
+        xty[g] = Xg.T @ yg
+
+    return BlocsOLS(
+        noms=list(noms),
+        variables=list(X_aligned.columns),
+        xtx=xtx,
+        xty=xty,
+        yty=np.add.reduceat(ys ** 2, bornes[:-1]),
+        somme_y=np.add.reduceat(ys, bornes[:-1]),
+        n=np.diff(bornes),
+    )
+
+
+def _resoudre(xtx, xty):
+    """
+    Résout en lot les équations normales xtx @ beta = xty (pseudo-inverse
+    si l'une des matrices est singulière).
+    """
+    try:
+        return np.linalg.solve(xtx, xty[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        return np.einsum('bij,bj->bi', np.linalg.pinv(xtx), xty)
+
+
+def kfold_spatial(y, X, n_folds=5, blocs=None, seed=0):
+    """
+    Validation croisée K-fold par blocs (départements) de la régression
+    log-OLS : chaque bloc est entièrement dans l'échantillon d'apprentissage
+    ou dans l'échantillon de test.
+
+    Les coefficients et les erreurs hors échantillon sont obtenus à partir
+    des statistiques par bloc, sans réestimer le modèle complet.
+
+    Paramètres
+    ----------
+    y : pd.Series
+        Variable dépendante (strictement positive)
+    X : pd.DataFrame
+        Variables explicatives
+    n_folds : int
+        Nombre de plis
+    blocs : pd.Series, optional
+        Identifiant de bloc (département par défaut)
+    seed : int
+        Graine de la répartition aléatoire des blocs
+
+    Retour
+    ------
+    pd.DataFrame
+        Une ligne par pli : effectifs, RMSE et R² hors échantillon sur
+        log(Y), puis coefficients estimés sur l'échantillon d'apprentissage
+    """
+    stats = blocs if isinstance(blocs, BlocsOLS) else precalculer_blocs(y, X, blocs)
+    n_blocs = len(stats.noms)
+    if not 2 <= n_folds <= n_blocs:
+        raise ValueError(f"n_folds doit être compris entre 2 et {n_blocs}")
+
+    rng = np.random.default_rng(seed)
+    plis = np.empty(n_blocs, dtype=np.int64)
+    plis[rng.permutation(n_blocs)] = np.arange(n_blocs) % n_folds
+
+    # Indicatrices (K, G) des blocs de test de chaque pli
+    test = (plis[None, :] == np.arange(n_folds)[:, None]).astype(np.float64)
+    train = 1.0 - test
+
+    beta = _resoudre(
+        np.einsum('kg,gij->kij', train, stats.xtx),
+        train @ stats.xty,
+    )
+
+    # SCR de test : y'y - 2 b'X'y + b'X'X b, calculée sur les blocs de test
+    xtx_test = np.einsum('kg,gij->kij', test, stats.xtx)
+    xty_test = test @ stats.xty
+    yty_test = test @ stats.yty
+    n_test = test @ stats.n
+    somme_y_test = test @ stats.somme_y
+
+    scr = (
+        yty_test
+        - 2 * np.einsum('ki,ki->k', beta, xty_test)
+        + np.einsum('ki,kij,kj->k', beta, xtx_test, beta)
+    )
+    sct = yty_test - somme_y_test ** 2 / n_test
+
+    resultats = pd.DataFrame({
+        'fold': np.arange(n_folds),
+        'n_train': (train @ stats.n).astype(int),
+        'n_test': n_test.astype(int),
+        'rmse_log': np.sqrt(np.maximum(scr, 0) / n_test),
+        'r2_log': 1 - scr / sct,
+    })
+    coefs = pd.DataFrame(beta, columns=stats.variables)
+    return pd.concat([resultats, coefs], axis=1)
+
+
+def _repliques_bootstrap(stats, n_repliques, seed_sequence):
+    """
+    Tire `n_repliques` échantillons bootstrap de blocs et renvoie les
+    coefficients estimés, de forme (n_repliques, p).
+    """
+    rng = np.random.default_rng(seed_sequence)
+    n_blocs = len(stats.noms)
+    # Multiplicité de chaque bloc dans chaque réplique
+    poids = rng.multinomial(n_blocs, np.full(n_blocs, 1.0 / n_blocs), size=n_repliques)
+    poids = poids.astype(np.float64)
+    xtx = np.einsum('bg,gij->bij', poids, stats.xtx)
+    xty = poids @ stats.xty
+    return _resoudre(xtx, xty)
+
+
+def bootstrap_clusters(y, X, n_bootstrap=1000, blocs=None, seed=0, n_jobs=None):
+    """
+    Bootstrap par grappes (départements) des coefficients de la régression
+    log-OLS. Chaque réplique tire les blocs avec remise et se réduit à une
+    combinaison des X'X/X'y précalculés suivie d'une petite résolution.
+
+    Paramètres
+    ----------
+    y : pd.Series
+        Variable dépendante (strictement positive)
+    X : pd.DataFrame
+        Variables explicatives
+    n_bootstrap : int
+        Nombre de répliques
+    blocs : pd.Series | BlocsOLS, optional
+        Identifiant de bloc (département par défaut), ou statistiques déjà
+        calculées par `precalculer_blocs`
+    seed : int
+        Graine aléatoire (résultats identiques quels que soient n_jobs et
+        le nombre de cœurs de la machine)
+    n_jobs : int, optional
+        Nombre de threads (par défaut, nombre de cœurs)
+
+    Retour
+    ------
+    pd.DataFrame
+        Coefficients estimés, une ligne par réplique
+    """
+    stats = blocs if isinstance(blocs, BlocsOLS) else precalculer_blocs(y, X, blocs)
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    # Découpage en lots de répliques, chacun avec son propre générateur. Le
+    # découpage ne dépend que de n_bootstrap : n_jobs ne fixe que la taille du
+    # pool, les tirages sont identiques d'une machine à l'autre
+    n_lots = max(1, math.ceil(n_bootstrap / TAILLE_LOT_BOOTSTRAP))
+    tailles = np.diff(np.linspace(0, n_bootstrap, n_lots + 1).astype(int))
+    graines = np.random.SeedSequence(seed).spawn(n_lots)
+
+    if n_jobs == 1:
+        lots = [_repliques_bootstrap(stats, t, g) for t, g in zip(tailles, graines)]
+    else:
+        # Les opérations numpy libèrent le GIL : des threads suffisent
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            lots = list(executor.map(
+                lambda args: _repliques_bootstrap(stats, *args), zip(tailles, graines)
+            ))
+
+    return pd.DataFrame(np.vstack(lots), columns=stats.variables)
+
+
+def resume_distribution(coefs, alpha=0.05):
+    """
+    Résume la distribution des coefficients issus du rééchantillonnage.
+
+    Paramètres
+    ----------
+    coefs : pd.DataFrame
+        Coefficients, une ligne par réplique (sortie de `bootstrap_clusters`)
+    alpha : float
+        Niveau de l'intervalle de confiance par percentiles
+
+    Retour
+    ------
+    pd.DataFrame
+        Moyenne, écart-type et bornes de l'intervalle par coefficient
+    """
+    return pd.DataFrame({
+        'moyenne': coefs.mean(),
+        'ecart_type': coefs.std(),
+        'ic_bas': coefs.quantile(alpha / 2),
+        'ic_haut': coefs.quantile(1 - alpha / 2),
+    })
@@ -0,0 +1,253 @@
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from .get_data import extract_departements
+
+
+GEOGRAPHIES = {'france', 'departement', 'commune'}
+PERIODES = {'aucune', 'annee', 'mois'}
+METRIQUES = {'count', 'mean', 'median', 'sum', 'min', 'max'}
+VALEURS = {
+    'prix_m2': 'rapport valeur foncière et surface bâtie',
+    'surface': 'surface_reelle_bati',
+    'valeur_fonciere': 'valeur_fonciere',
+}
+
+# Cubes précalculés au démarrage (requêtes des tableaux de bord)
+CUBES_CHAUDS = [
+    {'geo': 'departement', 'par_type': True, 'periode': 'annee', 'metrique': m, 'valeur': 'prix_m2'}
+    for m in ('count', 'median', 'mean')
+] + [
+    {'geo': 'departement', 'par_type': True, 'periode': 'aucune', 'metrique': m, 'valeur': v}
+    for m in ('count', 'median') for v in ('prix_m2', 'surface')
+]
+
+
+class MoteurAgregats:
+    """
+    Agrégats des transactions nettoyées (géographie x type de bien x
+    période, une métrique), avec cache LRU des résultats.
+
+    Les dimensions sont encodées une seule fois en catégories au chargement ;
+    les cubes les plus demandés sont précalculés.
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Transactions nettoyées (ex : df_sans_lots tronqué, ou
+        `ouvrir_store(...).to_frame()`), avec 'code_commune', 'type_local',
+        'date_mutation' et les colonnes de `VALEURS` disponibles
+    taille_cache : int
+        Nombre maximal de résultats conservés
+    precalculer : bool
+        Précalculer les `CUBES_CHAUDS` au démarrage
+    """
+
+    def __init__(self, df, taille_cache=512, precalculer=True):
+        codes = df['code_commune'].astype(str)
+        dates = pd.to_datetime(df['date_mutation'])
+        self.donnees = pd.DataFrame({
+            'france': pd.Categorical(np.full(len(df), 'FR')),
+            'commune': pd.Categorical(codes),
+            'departement': pd.Categorical(extract_departements(codes)),
+            'type_local': pd.Categorical(df['type_local']),
+            'annee': dates.dt.year.astype('Int16'),
+            'mois': dates.dt.to_period('M').astype(str).astype('category'),
+        }, index=pd.RangeIndex(len(df)))
+        for nom, colonne in VALEURS.items():
+            if colonne in df.columns:
+                self.donnees[nom] = df[colonne].to_numpy(dtype=np.float64)
+
+        self.taille_cache = taille_cache
+        self._cache = OrderedDict()
+        self._verrou = threading.Lock()
+        self.succes = 0
+        self.echecs = 0
+        if precalculer:
+            for cube in CUBES_CHAUDS:
+                if cube['valeur'] in self.donnees.columns:
+                    self.requete(**cube)
+
+    @staticmethod
+    def _cle(geo, par_type, periode, metrique, valeur, filtres):
+        return (geo, bool(par_type), periode, metrique, valeur,
+                tuple(sorted((k, tuple(sorted(map(str, v)))) for k, v in (filtres or {}).items())))
+
+    def _calculer(self, geo, par_type, periode, metrique, valeur, filtres):
+        donnees = self.donnees
+        if filtres:
+            masque = np.ones(len(donnees), dtype=bool)
+            for colonne, valeurs in filtres.items():
+                serie = donnees[colonne]
+                if colonne == 'annee':
+                    masque &= serie.isin([int(v) for v in valeurs]).to_numpy(dtype=bool)
+                else:
+                    masque &= serie.isin(list(valeurs)).to_numpy()
+            donnees = donnees[masque]
+
+        cles = [geo] + (['type_local'] if par_type else []) + ([periode] if periode != 'aucune' else [])
+        groupes = donnees.groupby(cles, observed=True, sort=True)[valeur]
+        resultat = groupes.size() if metrique == 'count' else groupes.agg(metrique)
+        return resultat.rename(metrique).reset_index()
+
+    def requete(self, geo='departement', par_type=True, periode='aucune', metrique='median',
+                valeur='prix_m2', filtres=None):
+        """
+        Calcule (ou relit depuis le cache) un agrégat.
+
+        Paramètres
+        ----------
+        geo : {'france', 'departement', 'commune'}
+            Niveau géographique
+        par_type : bool
+            Ventiler par type de bien
+        periode : {'aucune', 'annee', 'mois'}
+            Ventilation temporelle
+        metrique : {'count', 'mean', 'median', 'sum', 'min', 'max'}
+            Statistique calculée
+        valeur : {'prix_m2', 'surface', 'valeur_fonciere'}
+            Mesure agrégée
+        filtres : dict, optional
+            Valeurs à conserver par dimension, ex : {'departement': ['75'],
+            'type_local': ['Appartement'], 'annee': [2023]}
+
+        Retour
+        ------
+        pd.DataFrame
+            Copie du résultat (modifiable sans affecter le cache)
+        """
+        if geo not in GEOGRAPHIES:
+            raise ValueError(f"geo doit être parmi {sorted(GEOGRAPHIES)}")
+        if periode not in PERIODES:
+            raise ValueError(f"periode doit être parmi {sorted(PERIODES)}")
+        if metrique not in METRIQUES:
+            raise ValueError(f"metrique doit être parmi {sorted(METRIQUES)}")
+        if valeur not in self.donnees.columns or valeur not in VALEURS:
+            raise ValueError(f"valeur indisponible : {valeur}")
+        for colonne in filtres or {}:
+            if colonne not in ('departement', 'commune', 'type_local', 'annee', 'mois'):
+                raise ValueError(f"Filtre non supporté : {colonne}")
+
+        cle = self._cle(geo, par_type, periode, metrique, valeur, filtres)
+        with self._verrou:
+            if cle in self._cache:
+                self._cache.move_to_end(cle)
+                self.succes += 1
+                return self._cache[cle].copy()
+            self.echecs += 1
+
+        resultat = self._calculer(geo, par_type, periode, metrique, valeur, filtres)
+        with self._verrou:
+            self._cache[cle] = resultat
+            self._cache.move_to_end(cle)
+            while len(self._cache) > self.taille_cache:
+                self._cache.popitem(last=False)
+        # Copie : une modification par l'appelant (ex : rename(inplace=True))
+        # ne doit pas altérer l'entrée du cache
+        return resultat.copy()
+
+    def statistiques_cache(self):
+        with self._verrou:
+            return {'entrees': len(self._cache), 'taille_max': self.taille_cache,
+                    'succes': self.succes, 'echecs': self.echecs}
+
+
+def _gestionnaire(moteur):
+    """
+    Crée la classe de gestion des requêtes HTTP liée au moteur.
+    """
+
+    class Gestionnaire(BaseHTTPRequestHandler):
+
+        def _repondre(self, code, contenu):
+            corps = json.dumps(contenu, ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+            if url.path == '/sante':
+                return self._repondre(200, {'statut': 'ok', 'lignes': len(moteur.donnees)})
+            if url.path == '/cache':
+                return self._repondre(200, moteur.statistiques_cache())
+            if url.path != '/agregat':
+                return self._repondre(404, {'erreur': f"Chemin inconnu : {url.path}"})
+
+            debut = time.perf_counter()
+            filtres = {
+                k: params[k].split(',')
+                for k in ('departement', 'commune', 'type_local', 'annee', 'mois') if k in params
+            }
+            try:
+                resultat = moteur.requete(
+                    geo=params.get('geo', 'departement'),
+                    par_type=params.get('par_type', '1') not in ('0', 'false', 'non'),
+                    periode=params.get('periode', 'aucune'),
+                    metrique=params.get('metrique', 'median'),
+                    valeur=params.get('valeur', 'prix_m2'),
+                    filtres=filtres or None,
+                )
+            except ValueError as e:
+                return self._repondre(400, {'erreur': str(e)})
+
+            self._repondre(200, {
+                'lignes': resultat.to_dict(orient='records'),
+                'duree_ms': round((time.perf_counter() - debut) * 1000, 2),
+            })
+
+        def log_message(self, format, *args):
+            pass  # Pas de journal par requête (tableaux de bord très bavards)
+
+    return Gestionnaire
+
+
+def lancer_serveur(df, hote='127.0.0.1', port=8050, taille_cache=512, bloquant=True):
+    """
+    Lance le serveur HTTP local d'agrégats.
+
+    Points d'accès :
+    - GET /agregat?geo=departement&par_type=1&periode=annee&metrique=median
+      &valeur=prix_m2&departement=75,92&type_local=Appartement
+    - GET /cache : statistiques du cache
+    - GET /sante : état du serveur
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Transactions nettoyées
+    hote, port : str, int
+        Adresse d'écoute
+    taille_cache : int
+        Nombre maximal de résultats en cache
+    bloquant : bool
+        Si False, le serveur tourne dans un thread (utile dans un notebook)
+
+    Retour
+    ------
+    ThreadingHTTPServer
+        Le serveur (à arrêter avec `.shutdown()` en mode non bloquant)
+    """
+    moteur = MoteurAgregats(df, taille_cache=taille_cache)
+    serveur = ThreadingHTTPServer((hote, port), _gestionnaire(moteur))
+    serveur.moteur = moteur
+    print(f"Serveur d'agrégats : http://{hote}:{port}/agregat")
+    if bloquant:
+        try:
+            serveur.serve_forever()
+        finally:
+            serveur.server_close()
+    else:
+        threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return serveur
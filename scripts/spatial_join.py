@@ -0,0 +1,201 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from .get_data import extract_departements
+
+
+GEOJSON_DEPARTEMENTS = os.path.join(
+    os.path.dirname(__file__), '..', 'Données', 'data', 'departements-100m.geojson'
+)
+
+# Au-delà de ce nombre de zones (ex : communes), les points sont affectés
+# par requête sur l'arbre ; en deçà (ex : départements), par une boucle sur
+# les zones avec `shapely.contains_xy`, plus rapide
+SEUIL_BOUCLE_ZONES = 500
+
+
+class IndexSpatial:
+    """
+    Index spatial sur des zones (départements ou communes) pour
+    l'affectation en masse de points à la zone qui les contient : boucle
+    sur les zones préparées pour les départements, STRtree au-delà de
+    `SEUIL_BOUCLE_ZONES` zones.
+
+    Paramètres
+    ----------
+    zones : gpd.GeoDataFrame
+        Géométries des zones (coordonnées WGS84 : longitude, latitude)
+    colonne_code : str
+        Colonne contenant le code de chaque zone
+    """
+
+    def __init__(self, zones, colonne_code='code'):
+        if zones.crs is not None and not zones.crs.equals('EPSG:4326'):
+            zones = zones.to_crs(epsg=4326)
+        self.codes = zones[colonne_code].astype(str).to_numpy()
+        self.geometries = zones.geometry.to_numpy()
+        # Géométries préparées : tests point-dans-polygone bien plus rapides
+        shapely.prepare(self.geometries)
+        self.bornes = shapely.bounds(self.geometries)  # (xmin, ymin, xmax, ymax)
+        self.arbre = shapely.STRtree(self.geometries) if len(self.geometries) > SEUIL_BOUCLE_ZONES else None
+
+    @classmethod
+    def depuis_fichier(cls, path=GEOJSON_DEPARTEMENTS, colonne_code='code'):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Le fichier GeoJSON n'existe pas: {path}")
+        return cls(gpd.read_file(path), colonne_code)
+
+    def _assigner_lot(self, longitude, latitude):
+        """
+        Renvoie, pour chaque point du lot, l'indice de la zone qui le
+        contient (-1 si aucune ou coordonnées manquantes). Un point situé
+        exactement sur une frontière n'est rattaché à aucune zone ; si des
+        zones se chevauchent, la première l'emporte.
+        """
+        resultat = np.full(len(longitude), -1, dtype=np.int64)
+        valides = np.flatnonzero(np.isfinite(longitude) & np.isfinite(latitude))
+        if self.arbre is not None:
+            points = shapely.points(longitude[valides], latitude[valides])
+            idx_points, idx_zones = self.arbre.query(points, predicate='within')
+            idx_points, premier = np.unique(idx_points, return_index=True)
+            resultat[valides[idx_points]] = idx_zones[premier]
+            return resultat
+
+        # Points triés par longitude : les candidats d'une zone (dans son
+        # rectangle englobant) sont une tranche, filtrée ensuite en latitude
+        ordre = valides[np.argsort(longitude[valides], kind='stable')]
+        xs, ys = longitude[ordre], latitude[ordre]
+        for zone, (xmin, ymin, xmax, ymax) in enumerate(self.bornes):
+            debut = np.searchsorted(xs, xmin, side='left')
+            fin = np.searchsorted(xs, xmax, side='right')
+            if debut == fin:
+                continue
+            candidats = debut + np.flatnonzero((ys[debut:fin] >= ymin) & (ys[debut:fin] <= ymax))
+            candidats = candidats[resultat[ordre[candidats]] < 0]
+            if len(candidats) == 0:
+                continue
+            dedans = shapely.contains_xy(self.geometries[zone], xs[candidats], ys[candidats])
+            resultat[ordre[candidats[dedans]]] = zone
+        return resultat
+
+    def assigner(self, longitude, latitude, taille_lot=500_000, n_jobs=None):
+        """
+        Affecte chaque point (longitude, latitude) à la zone qui le contient.
+
+        Les points sont traités par lots, en parallèle (shapely libère le GIL
+        pendant les tests point-dans-polygone).
+
+        Paramètres
+        ----------
+        longitude, latitude : array-like
+            Coordonnées WGS84 des points
+        taille_lot : int
+            Nombre de points par lot
+        n_jobs : int, optional
+            Nombre de threads (par défaut, nombre de cœurs)
+
+        Retour
+        ------
+        np.ndarray
+            Code de la zone de chaque point (None si hors de toute zone)
+        """
+        longitude = np.asarray(longitude, dtype=np.float64)
+        latitude = np.asarray(latitude, dtype=np.float64)
+        bornes = range(0, len(longitude), taille_lot)
+
+        with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as executor:
+            lots = list(executor.map(
+                lambda d: self._assigner_lot(longitude[d:d + taille_lot], latitude[d:d + taille_lot]),
+                bornes
+            ))
+        indices = np.concatenate(lots) if lots else np.empty(0, dtype=np.int64)
+
+        codes = np.append(self.codes, None).astype(object)
+        return codes[indices]  # l'indice -1 renvoie None
+
+
+def assigner_departements(df, index=None, colonne='departement_spatial', **kwargs):
+    """
+    Ajoute le département de chaque transaction d'après ses coordonnées
+    ('longitude', 'latitude'), par jointure spatiale avec les contours des
+    départements.
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Transactions DVF avec 'longitude' et 'latitude'
+    index : IndexSpatial, optional
+        Index des départements (construit depuis le GeoJSON du projet sinon)
+    colonne : str
+        Nom de la colonne ajoutée
+    **kwargs
+        Options de `IndexSpatial.assigner` (taille_lot, n_jobs)
+
+    Retour
+    ------
+    pd.DataFrame
+        Copie de df avec la colonne `colonne`
+    """
+    if index is None:
+        index = IndexSpatial.depuis_fichier()
+    df = df.copy()
+    df[colonne] = index.assigner(df['longitude'].to_numpy(), df['latitude'].to_numpy(), **kwargs)
+    return df
+
+
+def valider_codes_communes(df, index_departements=None, index_communes=None, **kwargs):
+    """
+    Contrôle la cohérence entre le code commune et la position de chaque
+    transaction, et corrige les codes lorsque c'est possible.
+
+    Sans contours communaux, seuls les codes corses numériques (20xxx) sont
+    corrigés en 2Axxx/2Bxxx d'après le département trouvé. Avec un index des
+    communes (ex : contours IGN), le code de la commune contenant le point
+    remplace tout code incohérent.
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Transactions avec 'code_commune', 'longitude' et 'latitude'
+    index_departements : IndexSpatial, optional
+        Index des départements (GeoJSON du projet par défaut)
+    index_communes : IndexSpatial, optional
+        Index des communes
+    **kwargs
+        Options de `IndexSpatial.assigner` (taille_lot, n_jobs)
+
+    Retour
+    ------
+    pd.DataFrame
+        Copie de df avec 'departement_spatial', 'code_commune_valide'
+        (bool, NA si pas de coordonnées) et 'code_commune_corrige'
+    """
+    df = assigner_departements(df, index_departements, **kwargs)
+    codes = df['code_commune'].astype(str)
+    departement_code = extract_departements(codes)
+    spatial = df['departement_spatial']
+    localise = spatial.notna()
+
+    valide = pd.Series(pd.NA, index=df.index, dtype='boolean')
+    valide[localise] = (departement_code[localise] == spatial[localise]).to_numpy()
+    df['code_commune_valide'] = valide
+
+    corrige = codes.copy()
+    corse = localise & (departement_code == '20') & spatial.isin(['2A', '2B'])
+    corrige[corse] = spatial[corse] + codes[corse].str[2:]
+
+    if index_communes is not None:
+        commune_spatiale = pd.Series(
+            index_communes.assigner(df['longitude'].to_numpy(), df['latitude'].to_numpy(), **kwargs),
+            index=df.index
+        )
+        a_corriger = commune_spatiale.notna() & (commune_spatiale != corrige)
+        corrige[a_corriger] = commune_spatiale[a_corriger]
+
+    df['code_commune_corrige'] = corrige
+    return df
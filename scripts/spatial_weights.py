@@ -0,0 +1,338 @@
+from dataclasses import dataclass
+import hashlib
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.spatial import cKDTree
+import shapely
+
+
+GEOJSON_DEPARTEMENTS = os.path.join(
+    os.path.dirname(__file__), '..', 'Données', 'data', 'departements-100m.geojson'
+)
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'Données', 'cache', 'poids')
+
+
+@dataclass
+class PoidsSpatiaux:
+    """
+    Matrice de poids spatiaux creuse (CSR), normalisée en ligne.
+
+    Attributs
+    ---------
+    codes : np.ndarray
+        Code de la zone (département ou commune) de chaque ligne/colonne
+    matrice : scipy.sparse.csr_matrix
+        Poids w_ij, chaque ligne sommant à 1 (0 pour les zones isolées)
+    """
+    codes: np.ndarray
+    matrice: sparse.csr_matrix
+
+    def aligner(self, codes):
+        """
+        Restreint la matrice aux zones `codes` (dans cet ordre) et la
+        renormalise en ligne. Les codes inconnus deviennent des zones isolées.
+        """
+        codes = np.asarray(codes).astype(str)
+        pos = pd.Index(self.codes).get_indexer(codes)
+        connus = pos >= 0
+        # Matrice de sélection (len(codes) x n) pour extraire le sous-graphe
+        selection = sparse.csr_matrix(
+            (np.ones(connus.sum()), (np.flatnonzero(connus), pos[connus])),
+            shape=(len(codes), len(self.codes))
+        )
+        binaire = (self.matrice > 0).astype(np.float64)
+        return PoidsSpatiaux(codes, _standardiser(selection @ binaire @ selection.T))
+
+
+def _standardiser(matrice):
+    """
+    Normalisation en ligne d'une matrice creuse (les lignes vides restent nulles).
+    """
+    matrice = sparse.csr_matrix(matrice, dtype=np.float64)
+    somme = np.asarray(matrice.sum(axis=1)).ravel()
+    inverse = np.divide(1.0, somme, out=np.zeros_like(somme), where=somme > 0)
+    return sparse.diags(inverse) @ matrice
+
+
+def poids_contiguite(zones, colonne_code='code'):
+    """
+    Poids de contiguïté « reine » : deux zones sont voisines si leurs
+    contours se touchent (un sommet commun suffit).
+
+    Paramètres
+    ----------
+    zones : gpd.GeoDataFrame
+        Géométries des zones
+    colonne_code : str
+        Colonne du code des zones
+
+    Retour
+    ------
+    PoidsSpatiaux
+    """
+    geometries = zones.geometry.to_numpy()
+    arbre = shapely.STRtree(geometries)
+    i, j = arbre.query(geometries, predicate='intersects')
+    garde = i != j
+    n = len(geometries)
+    matrice = sparse.csr_matrix((np.ones(garde.sum()), (i[garde], j[garde])), shape=(n, n))
+    # Symétrisation (la relation est symétrique aux imprécisions près)
+    matrice = ((matrice + matrice.T) > 0).astype(np.float64)
+    return PoidsSpatiaux(zones[colonne_code].astype(str).to_numpy(), _standardiser(matrice))
+
+
+def poids_knn(zones, k=8, colonne_code='code'):
+    """
+    Poids des k plus proches voisins, d'après les distances entre
+    centroïdes en Lambert-93.
+
+    Paramètres
+    ----------
+    zones : gpd.GeoDataFrame
+        Géométries des zones
+    k : int
+        Nombre de voisins
+    colonne_code : str
+        Colonne du code des zones
+
+    Retour
+    ------
+    PoidsSpatiaux
+    """
+    centroides = zones.to_crs(epsg=2154).geometry.centroid
+    points = np.column_stack([centroides.x.to_numpy(), centroides.y.to_numpy()])
+    n = len(points)
+    k = min(k, n - 1)
+    _, voisins = cKDTree(points).query(points, k=k + 1)
+    # La première colonne est la zone elle-même
+    i = np.repeat(np.arange(n), k)
+    j = voisins[:, 1:].ravel()
+    matrice = sparse.csr_matrix((np.ones(n * k), (i, j)), shape=(n, n))
+    return PoidsSpatiaux(zones[colonne_code].astype(str).to_numpy(), _standardiser(matrice))
+
+
+def charger_poids(path=GEOJSON_DEPARTEMENTS, methode='contiguite', k=8, colonne_code='code',
+                  cache_dir=CACHE_DIR):
+    """
+    Construit (ou relit depuis le cache) une matrice de poids à partir d'un
+    fichier de contours de départements ou de communes.
+
+    Paramètres
+    ----------
+    path : str
+        Fichier GeoJSON (ou tout format lu par geopandas)
+    methode : {'contiguite', 'knn'}
+        Type de voisinage
+    k : int
+        Nombre de voisins pour la méthode 'knn'
+    colonne_code : str
+        Colonne du code des zones
+    cache_dir : str | None
+        Dossier du cache (None pour ne pas utiliser de cache)
+
+    Retour
+    ------
+    PoidsSpatiaux
+    """
+    if methode not in ('contiguite', 'knn'):
+        raise ValueError("methode doit être 'contiguite' ou 'knn'")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Le fichier n'existe pas: {path}")
+
+    if cache_dir is not None:
+        stat = os.stat(path)
+        cle = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{methode}|{k}|{colonne_code}"
+        base = os.path.join(cache_dir, hashlib.md5(cle.encode()).hexdigest()[:16])
+        if os.path.exists(base + '.npz'):
+            return PoidsSpatiaux(np.load(base + '_codes.npy'), sparse.load_npz(base + '.npz').tocsr())
+
+    zones = gpd.read_file(path)
+    if methode == 'contiguite':
+        poids = poids_contiguite(zones, colonne_code)
+    else:
+        poids = poids_knn(zones, k, colonne_code)
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        sparse.save_npz(base + '.npz', poids.matrice)
+        np.save(base + '_codes.npy', np.asarray(poids.codes, dtype=str))
+    return poids
+
+
+def _valeurs_alignees(valeurs, poids):
+    """
+    Aligne une série indexée par code de zone sur la matrice de poids,
+    en retirant les zones sans valeur.
+    """
+    valeurs = valeurs.dropna()
+    valeurs = valeurs[~valeurs.index.duplicated(keep='first')]
+    poids = poids.aligner(valeurs.index)
+    return valeurs.to_numpy(dtype=np.float64), poids
+
+
+def moran_i(valeurs, poids, permutations=999, seed=0, taille_lot=100):
+    """
+    Indice de Moran global, avec pseudo p-value par permutations.
+
+    Paramètres
+    ----------
+    valeurs : pd.Series
+        Valeurs indexées par code de zone (ex : prix moyen au m² par commune)
+    poids : PoidsSpatiaux
+        Matrice de poids
+    permutations : int
+        Nombre de permutations (0 pour ne pas calculer de p-value)
+    seed : int
+        Graine aléatoire
+    taille_lot : int
+        Nombre de permutations traitées ensemble
+
+    Retour
+    ------
+    dict
+        'I', 'esperance' (-1/(n-1)), 'p_value' et 'n'
+    """
+    x, poids = _valeurs_alignees(valeurs, poids)
+    W = poids.matrice
+    n = len(x)
+    z = x - x.mean()
+    s0 = W.sum()
+    i_obs = n / s0 * (z @ (W @ z)) / (z @ z)
+
+    p_value = None
+    if permutations:
+        rng = np.random.default_rng(seed)
+        extremes = 0
+        for debut in range(0, permutations, taille_lot):
+            m = min(taille_lot, permutations - debut)
+            Z = np.stack([rng.permutation(z) for _ in range(m)], axis=1)  # (n, m)
+            i_perm = n / s0 * np.einsum('im,im->m', Z, W @ Z) / (z @ z)
+            # Test unilatéral dans le sens de l'autocorrélation observée
+            if i_obs >= -1.0 / (n - 1):
+                extremes += np.sum(i_perm >= i_obs)
+            else:
+                extremes += np.sum(i_perm <= i_obs)
+        p_value = (extremes + 1) / (permutations + 1)
+
+    return {'I': float(i_obs), 'esperance': -1.0 / (n - 1), 'p_value': p_value, 'n': n}
+
+
+def lisa(valeurs, poids, permutations=499, seed=0, alpha=0.05, taille_lot=50):
+    """
+    Indicateurs locaux d'autocorrélation spatiale (Moran local).
+
+    Les permutations tirent les valeurs sur l'ensemble des zones (et non
+    conditionnellement à chaque zone), ce qui permet de traiter toutes les
+    zones par un seul produit matrice creuse x matrice dense.
+
+    Paramètres
+    ----------
+    valeurs : pd.Series
+        Valeurs indexées par code de zone
+    poids : PoidsSpatiaux
+        Matrice de poids
+    permutations : int
+        Nombre de permutations
+    seed : int
+        Graine aléatoire
+    alpha : float
+        Seuil de significativité pour la classification en quadrants
+    taille_lot : int
+        Nombre de permutations traitées ensemble
+
+    Retour
+    ------
+    pd.DataFrame
+        Indexé par code : 'I_local', 'p_value', 'quadrant' ('HH', 'LL',
+        'HL', 'LH' si significatif, 'ns' sinon)
+    """
+    codes = valeurs.dropna().index
+    codes = codes[~codes.duplicated(keep='first')]
+    x, poids = _valeurs_alignees(valeurs, poids)
+    W = poids.matrice
+    z = x - x.mean()
+    m2 = (z @ z) / len(z)
+    decalage = W @ z
+    i_local = z * decalage / m2
+
+    rng = np.random.default_rng(seed)
+    extremes = np.zeros(len(z))
+    for debut in range(0, permutations, taille_lot):
+        m = min(taille_lot, permutations - debut)
+        Z = np.stack([rng.permutation(z) for _ in range(m)], axis=1)
+        i_perm = z[:, None] * (W @ Z) / m2
+        extremes += np.sum(np.abs(i_perm) >= np.abs(i_local)[:, None], axis=1)
+    p_value = (extremes + 1) / (permutations + 1)
+
+    quadrant = np.select(
+        [(z > 0) & (decalage > 0), (z < 0) & (decalage < 0), (z > 0) & (decalage < 0), (z < 0) & (decalage > 0)],
+        ['HH', 'LL', 'HL', 'LH'],
+        default='ns'
+    )
+    quadrant = np.where(p_value <= alpha, quadrant, 'ns')
+    return pd.DataFrame({'I_local': i_local, 'p_value': p_value, 'quadrant': quadrant},
+                        index=pd.Index(codes.astype(str), name='code'))
+
+
+def decalage_spatial(valeurs, poids, index=None):
+    """
+    Variable spatialement décalée Wx : moyenne pondérée des valeurs des
+    voisins. Les voisins sans valeur sont ignorés (renormalisation).
+
+    Paramètres
+    ----------
+    valeurs : pd.Series
+        Valeurs indexées par code de zone
+    poids : PoidsSpatiaux
+        Matrice de poids
+    index : pd.Index, optional
+        Codes pour lesquels calculer le décalage (par défaut l'index de
+        `valeurs`)
+
+    Retour
+    ------
+    pd.Series
+        Wx indexée par `index` (NaN pour les zones sans voisin renseigné)
+    """
+    valeurs = valeurs[~valeurs.index.duplicated(keep='first')]
+    index = valeurs.index if index is None else index
+    codes = pd.Index(pd.unique(np.concatenate([np.asarray(index).astype(str),
+                                                valeurs.index.astype(str)])))
+    poids = poids.aligner(codes)
+    x = valeurs.set_axis(valeurs.index.astype(str)).reindex(codes).to_numpy(dtype=np.float64)
+    renseigne = np.isfinite(x)
+    binaire = (poids.matrice > 0).astype(np.float64)
+    somme = binaire @ np.where(renseigne, x, 0.0)
+    nombre = binaire @ renseigne.astype(np.float64)
+    wx = np.divide(somme, nombre, out=np.full(len(x), np.nan), where=nombre > 0)
+    resultat = pd.Series(wx, index=codes).reindex(np.asarray(index).astype(str))
+    return pd.Series(resultat.to_numpy(), index=index, name=f"W_{valeurs.name}")
+
+
+def ajouter_decalage_spatial(X, poids, colonnes):
+    """
+    Ajoute à X les variables décalées W_<colonne>, par exemple avant
+    `run_log_ols_regression(y, X)` (modèle SLX).
+
+    Paramètres
+    ----------
+    X : pd.DataFrame
+        Variables explicatives indexées par code de zone
+    poids : PoidsSpatiaux
+        Matrice de poids
+    colonnes : list
+        Colonnes de X à décaler
+
+    Retour
+    ------
+    pd.DataFrame
+        Copie de X avec les colonnes décalées
+    """
+    X = X.copy()
+    for colonne in colonnes:
+        X[f"W_{colonne}"] = decalage_spatial(X[colonne], poids, X.index).to_numpy()
+    return X
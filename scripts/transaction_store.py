@@ -0,0 +1,242 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+MANIFEST = "manifest.json"
+VERSION = 1
+
+
+def _type_colonne(serie):
+    """
+    Détermine le mode de stockage d'une colonne : 'numerique', 'datetime'
+    ou 'categorie' (chaînes et catégories, stockées en codes entiers).
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return "datetime"
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_numeric_dtype(serie):
+        return "numerique"
+    return "categorie"
+
+
+def ecrire_store(df, dossier):
+    """
+    Écrit un DataFrame de transactions nettoyées sous forme de fichiers
+    colonne par colonne (.npy), lisibles en mémoire partagée (memory map),
+    accompagnés d'un manifeste JSON.
+
+    Les colonnes texte sont encodées en codes entiers (-1 pour les valeurs
+    manquantes) avec un fichier de catégories séparé. Un index autre que
+    l'index par défaut (0, 1, 2...) est stocké sous forme de colonnes,
+    déclarées dans le manifeste, et restauré à la lecture.
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Transactions DVF nettoyées (ex : df_sans_lots tronqué)
+    dossier : str
+        Dossier de destination (remplacé s'il existe déjà)
+
+    Retour
+    ------
+    str
+        Chemin du dossier écrit
+    """
+    parent = os.path.dirname(os.path.abspath(dossier))
+    os.makedirs(parent, exist_ok=True)
+    # Écriture dans un dossier temporaire puis renommage : un lecteur ne voit
+    # jamais un store à moitié écrit, et l'ancien store n'est supprimé qu'une
+    # fois le nouveau en place
+    index = []
+    defaut = (isinstance(df.index, pd.RangeIndex) and df.index.start == 0
+              and df.index.step == 1 and df.index.name is None)
+    if not defaut:
+        index = [n if n is not None else f"__index_{i}__" for i, n in enumerate(df.index.names)]
+        communs = sorted(set(map(str, index)) & set(map(str, df.columns)))
+        if communs:
+            raise ValueError(f"Noms d'index déjà utilisés comme colonnes : {communs}")
+        df = df.reset_index(names=index)
+
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".store_")
+
+    colonnes = []
+    for i, nom in enumerate(df.columns):
+        serie = df[nom]
+        type_col = _type_colonne(serie)
+        fichier = f"col_{i:03d}.npy"
+        entree = {"nom": str(nom), "fichier": fichier, "type": type_col}
+
+        if type_col == "numerique":
+            valeurs = serie.to_numpy()
+            if valeurs.dtype == object:
+                valeurs = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+        elif type_col == "datetime":
+            valeurs = serie.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        else:
+            codes, categories = pd.factorize(serie.astype(object), sort=True)
+            n_cat = len(categories)
+            dtype_codes = np.int8 if n_cat < 2 ** 7 else np.int16 if n_cat < 2 ** 15 else np.int32
+            valeurs = codes.astype(dtype_codes)
+            fichier_cat = f"col_{i:03d}_categories.npy"
+            np.save(os.path.join(tmp, fichier_cat), np.asarray(categories, dtype=str))
+            entree["categories"] = fichier_cat
+
+        entree["dtype"] = str(valeurs.dtype)
+        np.save(os.path.join(tmp, fichier), np.ascontiguousarray(valeurs))
+        colonnes.append(entree)
+
+    manifest = {"version": VERSION, "n_lignes": len(df), "colonnes": colonnes,
+                "index": [str(n) for n in index]}
+    with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    if not os.path.exists(dossier):
+        os.replace(tmp, dossier)
+        return dossier
+
+    # L'ancien store est mis de côté (renommage), remplacé, puis supprimé ;
+    # en cas d'échec du remplacement, il est remis en place
+    ancien = tmp + "_ancien"
+    os.replace(dossier, ancien)
+    try:
+        os.replace(tmp, dossier)
+    except OSError:
+        os.replace(ancien, dossier)
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    shutil.rmtree(ancien, ignore_errors=True)
+    return dossier
+
+
+class TransactionStore:
+    """
+    Accès en lecture seule à un store écrit par `ecrire_store`.
+
+    Les colonnes sont ouvertes à la demande en memory map : l'ouverture est
+    quasi instantanée et plusieurs processus partagent les mêmes pages du
+    cache système au lieu d'en garder chacun une copie privée.
+
+    Paramètres
+    ----------
+    dossier : str
+        Dossier du store
+    """
+
+    def __init__(self, dossier):
+        self.dossier = dossier
+        with open(os.path.join(dossier, MANIFEST), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != VERSION:
+            raise ValueError(f"Version de store non supportée : {self.manifest.get('version')}")
+        self._colonnes = {c["nom"]: c for c in self.manifest["colonnes"]}
+        # Colonnes de l'index d'origine (vide pour l'index par défaut)
+        self.index = self.manifest.get("index", [])
+        self._cache = {}
+
+    @property
+    def colonnes(self):
+        return [c for c in self._colonnes if c not in self.index]
+
+    def __len__(self):
+        return self.manifest["n_lignes"]
+
+    def __contains__(self, nom):
+        return nom in self._colonnes
+
+    def tableau(self, nom):
+        """
+        Renvoie le tableau brut (memory map) d'une colonne : valeurs pour les
+        colonnes numériques, int64 pour les dates, codes pour les catégories.
+        """
+        if nom not in self._colonnes:
+            raise KeyError(f"La colonne '{nom}' est absente du store.")
+        if nom not in self._cache:
+            entree = self._colonnes[nom]
+            self._cache[nom] = np.load(os.path.join(self.dossier, entree["fichier"]), mmap_mode="r")
+        return self._cache[nom]
+
+    def categories(self, nom):
+        """
+        Renvoie les catégories d'une colonne texte.
+        """
+        entree = self._colonnes[nom]
+        cle = (nom, "categories")
+        if cle not in self._cache:
+            self._cache[cle] = np.load(os.path.join(self.dossier, entree["categories"]))
+        return self._cache[cle]
+
+    def serie(self, nom, masque=None):
+        """
+        Renvoie une colonne sous forme de pd.Series.
+
+        Paramètres
+        ----------
+        nom : str
+            Nom de la colonne
+        masque : np.ndarray, optional
+            Masque booléen ou indices des lignes à conserver. Sans masque, les
+            colonnes numériques restent adossées au memory map (pas de copie).
+        """
+        entree = self._colonnes[nom]
+        valeurs = self.tableau(nom)
+        if masque is not None:
+            valeurs = valeurs[masque]
+
+        if entree["type"] == "numerique":
+            return pd.Series(valeurs, name=nom, copy=False)
+        if entree["type"] == "datetime":
+            return pd.Series(np.asarray(valeurs).view("datetime64[ns]"), name=nom)
+        return pd.Series(
+            pd.Categorical.from_codes(np.asarray(valeurs), categories=self.categories(nom)),
+            name=nom,
+        )
+
+    def __getitem__(self, nom):
+        return self.serie(nom)
+
+    def to_frame(self, colonnes=None, masque=None):
+        """
+        Matérialise tout ou partie du store en DataFrame, avec l'index
+        d'origine s'il a été stocké.
+
+        Paramètres
+        ----------
+        colonnes : list, optional
+            Colonnes à charger (par défaut toutes)
+        masque : np.ndarray, optional
+            Masque booléen ou indices des lignes à conserver
+
+        Retour
+        ------
+        pd.DataFrame
+        """
+        colonnes = self.colonnes if colonnes is None else list(colonnes)
+        df = pd.DataFrame({nom: self.serie(nom, masque) for nom in colonnes})
+        if self.index:
+            niveaux = [self.serie(nom, masque) for nom in self.index]
+            # Index texte restitué en valeurs, pas en catégories
+            niveaux = [n.astype(object) if isinstance(n.dtype, pd.CategoricalDtype) else n
+                       for n in niveaux]
+            noms = [None if n.startswith("__index_") else n for n in self.index]
+            if len(niveaux) == 1:
+                index = pd.Index(niveaux[0], name=noms[0])
+            else:
+                index = pd.MultiIndex.from_arrays(niveaux, names=noms)
+            df.index = index
+        return df
+
+
+def ouvrir_store(dossier):
+    """
+    Ouvre un store de transactions écrit par `ecrire_store`.
+
+    Exemple
+    -------
+    store = ouvrir_store("Données/store/dvf_sans_lots")
+    surfaces(store.to_frame(['type_local', 'surface_reelle_bati']))
+    """
+    return TransactionStore(dossier)
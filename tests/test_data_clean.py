@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from scripts.data_clean import classifier_mutations, construire_df_sans_lots, troncature_lots
+
+
+COLONNES = ['id_mutation', 'id_parcelle', 'nature_culture', 'type_local', 'lot1_numero',
+            'surface_reelle_bati', 'valeur_fonciere']
+
+
+def _dvf(lignes):
+    return pd.DataFrame(lignes, columns=COLONNES)
+
+
+def test_maison_repetee_par_nature_de_culture_reste_simple():
+    # Disposition DVF : la ligne de la maison est répétée pour chaque
+    # nature de culture de la parcelle
+    df = _dvf([
+        ('2023-1', '01001000AB0001', 'sols', 'Maison', None, 100.0, 250000.0),
+        ('2023-1', '01001000AB0001', 'jardins', 'Maison', None, 100.0, 250000.0),
+        ('2023-1', '01001000AB0001', 'sols', 'Dépendance', None, np.nan, 250000.0),
+        ('2023-2', '75056000AB0001', None, 'Appartement', '12', 40.0, 400000.0),
+        ('2023-2', '75056000AB0001', None, 'Appartement', '13', 35.0, 400000.0),
+    ])
+
+    categories = classifier_mutations(df)
+
+    assert list(categories) == ['simple'] * 3 + ['multi_lots'] * 2
+    df_sans_lots = construire_df_sans_lots(df)
+    assert len(df_sans_lots) == 1
+    assert df_sans_lots['rapport valeur foncière et surface bâtie'].iloc[0] == 2500.0
+
+
+def test_classifier_mutations_sans_vente():
+    categories = classifier_mutations(_dvf([]))
+
+    assert len(categories) == 0
+    assert list(categories.cat.categories) == ['sans_logement', 'simple', 'multi_lots', 'mixte']
+    assert construire_df_sans_lots(_dvf([])).empty
+
+
+def test_troncature_lots_equivalent_fusion_pandas():
+    rng = np.random.default_rng(0)
+    n = 5_000
+    df = pd.DataFrame({
+        'code_commune': rng.choice(['01001', '13055', '75056', None], n),
+        'rapport valeur foncière et surface bâtie': rng.lognormal(8, 0.5, n),
+    }, index=rng.permutation(n))
+    quantiles = (
+        df.groupby('code_commune')['rapport valeur foncière et surface bâtie']
+        .quantile([0.025, 0.975]).unstack().reset_index()
+        .rename(columns={0.025: 'quantile_025', 0.975: 'quantile_975'})
+    )
+    attendu = df.merge(quantiles, on='code_commune', how='left')
+    attendu = attendu[
+        (attendu['rapport valeur foncière et surface bâtie'] > attendu['quantile_025'])
+        & (attendu['rapport valeur foncière et surface bâtie'] < attendu['quantile_975'])
+    ].reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(troncature_lots(df), attendu)
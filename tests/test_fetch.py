@@ -0,0 +1,104 @@
+import hashlib
+import os
+
+from fsspec.implementations.memory import MemoryFileSystem
+import pytest
+
+from scripts.fetch import FetchManager
+
+
+class FauxS3(MemoryFileSystem):
+    """
+    S3 local simulé en mémoire : `info` renvoie un ETag comme S3 (MD5 du
+    contenu, ou ETag imposé, ex : ETag multipart).
+    """
+    protocol = "fauxs3"
+    store = {}
+    pseudo_dirs = [""]
+    etags = {}
+
+    def info(self, path, **kwargs):
+        info = dict(super().info(path, **kwargs))
+        chemin = self._strip_protocol(path)
+        if info["type"] != "file":
+            return info
+        if chemin in self.etags:
+            info["ETag"] = self.etags[chemin]
+        else:
+            info["ETag"] = '"%s"' % hashlib.md5(self.cat_file(path)).hexdigest()
+        return info
+
+
+TAILLE_BLOC = 1024
+CONTENU = os.urandom(10 * TAILLE_BLOC + 17)
+
+
+@pytest.fixture
+def fs():
+    FauxS3.store.clear()
+    FauxS3.etags.clear()
+    fs = FauxS3(skip_instance_cache=True)
+    fs.pipe("bucket/dvf_2023.csv", CONTENU)
+    return fs
+
+
+def _gestionnaire(fs, destination, **kwargs):
+    return FetchManager(str(destination), fs=fs, prefixe="bucket", n_threads=2,
+                        taille_bloc=TAILLE_BLOC, **kwargs)
+
+
+def _interrompre(fs, destination, apres=3):
+    """
+    Téléchargement interrompu après `apres` blocs (laisse un .part).
+    """
+    def progression(nom, recus, total):
+        if recus >= apres * TAILLE_BLOC:
+            raise ConnectionError("connexion perdue")
+
+    with pytest.raises(ConnectionError):
+        _gestionnaire(fs, destination, tentatives=1, progression=progression).telecharger(["dvf_2023.csv"])
+    assert os.path.getsize(destination / "dvf_2023.csv.part") == 3 * TAILLE_BLOC
+
+
+def test_telechargement_verifie(fs, tmp_path):
+    metriques = _gestionnaire(fs, tmp_path).telecharger(["dvf_2023.csv"])
+
+    assert (tmp_path / "dvf_2023.csv").read_bytes() == CONTENU
+    assert metriques.loc[0, "statut"] == "telecharge"
+    assert bool(metriques.loc[0, "md5_verifie"])
+
+    metriques = _gestionnaire(fs, tmp_path).telecharger(["dvf_2023.csv"])
+    assert metriques.loc[0, "statut"] == "present"
+
+
+def test_reprise_apres_interruption(fs, tmp_path):
+    _interrompre(fs, tmp_path)
+
+    metriques = _gestionnaire(fs, tmp_path).telecharger(["dvf_2023.csv"])
+
+    assert metriques.loc[0, "repris_a"] == 3 * TAILLE_BLOC
+    assert metriques.loc[0, "octets_telecharges"] == len(CONTENU) - 3 * TAILLE_BLOC
+    assert (tmp_path / "dvf_2023.csv").read_bytes() == CONTENU
+
+
+def test_part_perime_ecarte_si_objet_modifie(fs, tmp_path):
+    _interrompre(fs, tmp_path)
+    # Nouvelle version de l'objet, ETag multipart (pas de MD5 vérifiable)
+    nouveau = os.urandom(len(CONTENU))
+    fs.pipe("bucket/dvf_2023.csv", nouveau)
+    FauxS3.etags[fs._strip_protocol("bucket/dvf_2023.csv")] = '"0123456789abcdef-2"'
+
+    metriques = _gestionnaire(fs, tmp_path).telecharger(["dvf_2023.csv"])
+
+    assert metriques.loc[0, "repris_a"] is None
+    assert (tmp_path / "dvf_2023.csv").read_bytes() == nouveau
+
+
+def test_somme_de_controle_invalide(fs, tmp_path):
+    FauxS3.etags[fs._strip_protocol("bucket/dvf_2023.csv")] = '"%s"' % ("0" * 32)
+
+    with pytest.raises(IOError, match="MD5"):
+        _gestionnaire(fs, tmp_path, tentatives=1).telecharger(["dvf_2023.csv"])
+
+    assert not (tmp_path / "dvf_2023.csv").exists()
+    assert not (tmp_path / "dvf_2023.csv.part").exists()
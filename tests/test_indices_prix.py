@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from scripts.indices_prix import IndicesPrix
+
+
+def _ventes(lignes):
+    return pd.DataFrame(lignes, columns=['id_parcelle', 'code_commune', 'date_mutation',
+                                         'type_local', 'rapport valeur foncière et surface bâtie'])
+
+
+def test_indice_base_au_premier_mois_identifie():
+    indices = IndicesPrix()
+    indices.ajouter(_ventes([
+        # Paris : paire janvier -> mars (origine de l'indice en janvier)
+        ('75056000AB0001', '75056', '2020-01-15', 'Maison', 10000.0),
+        ('75056000AB0001', '75056', '2020-03-15', 'Maison', 10500.0),
+        # Bouches-du-Rhône : deux paires février -> avril, +10 %
+        ('13055000AB0001', '13055', '2020-02-10', 'Maison', 4000.0),
+        ('13055000AB0001', '13055', '2020-04-10', 'Maison', 4400.0),
+        ('13055000AB0002', '13055', '2020-02-20', 'Maison', 5000.0),
+        ('13055000AB0002', '13055', '2020-04-20', 'Maison', 5500.0),
+    ]))
+
+    indice = indices.indice_ventes_repetees('13')
+
+    assert np.isnan(indice[pd.Period('2020-01', 'M')])
+    assert indice[pd.Period('2020-02', 'M')] == 100.0
+    assert np.isnan(indice[pd.Period('2020-03', 'M')])
+    np.testing.assert_allclose(indice[pd.Period('2020-04', 'M')], 110.0)
+
+
+def test_ventes_repetees_incrementales():
+    lignes = [
+        ('75056000AB0001', '75056', '2020-01-15', 'Maison', 10000.0),
+        ('75056000AB0001', '75056', '2020-03-15', 'Maison', 11000.0),
+        ('75056000AB0002', '75056', '2020-01-20', 'Maison', 8000.0),
+        ('75056000AB0002', '75056', '2020-05-20', 'Maison', 9600.0),
+    ]
+    en_une_fois = IndicesPrix().ajouter(_ventes(lignes))
+    par_mois = IndicesPrix()
+    for ligne in sorted(lignes, key=lambda l: l[2]):
+        par_mois.ajouter(_ventes([ligne]))
+
+    pd.testing.assert_series_equal(par_mois.indice_ventes_repetees(), en_une_fois.indice_ventes_repetees())
+    np.testing.assert_allclose(en_une_fois.indice_ventes_repetees()[pd.Period('2020-03', 'M')], 110.0)
@@ -0,0 +1,20 @@
+import tracemalloc
+
+from scripts.instrumentation import profiler
+
+
+def test_profiler_laisse_tracemalloc_demarre_par_l_appelant():
+    tracemalloc.start()
+    try:
+        with profiler(modules=['data_clean']):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_profiler_arrete_tracemalloc_qu_il_a_demarre():
+    assert not tracemalloc.is_tracing()
+    with profiler(modules=['data_clean']):
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
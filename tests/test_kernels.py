@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts import kernels
+from scripts.kernels import (
+    GroupesTries,
+    agregation_groupee,
+    decrire_groupes,
+    masque_troncature_lignes,
+    statistiques_groupees,
+)
+
+
+@pytest.fixture
+def df():
+    """
+    Groupes de tailles très variées (dont des groupes d'une seule valeur),
+    avec des NaN et des valeurs répétées.
+    """
+    rng = np.random.default_rng(0)
+    n = 50_000
+    valeurs = rng.lognormal(8, 0.5, n).round(-1)
+    valeurs[rng.random(n) < 0.01] = np.nan
+    cles = (rng.zipf(1.5, n) % 300).astype(str)
+    return pd.DataFrame({'g': cles, 'v': valeurs})
+
+
+def test_decrire_groupes_equivalent_pandas(df):
+    attendu = df.groupby('g')['v'].describe()
+    pd.testing.assert_frame_equal(decrire_groupes(df, 'g', 'v'), attendu, check_names=False)
+
+
+@pytest.mark.parametrize('agg', ['mean', 'median', 'sum', 'count', 'min', 'max', 'std'])
+def test_agregation_groupee_equivalent_pandas(df, agg):
+    attendu = df.groupby('g', as_index=False)['v'].agg(agg)
+    obtenu = agregation_groupee(df, 'g', 'v', agg)
+    pd.testing.assert_frame_equal(obtenu, attendu, check_dtype=False)
+
+
+def test_moyenne_tronquee_equivalent_troncature(df):
+    q = df.groupby('g')['v'].quantile([0.025, 0.975]).unstack()
+    tronque = df[(df['v'] > df['g'].map(q[0.025])) & (df['v'] < df['g'].map(q[0.975]))]
+    attendu = tronque.groupby('g')['v'].mean()
+
+    obtenu = agregation_groupee(df, 'g', 'v', 'moyenne_tronquee').set_index('g')['v']
+    pd.testing.assert_series_equal(obtenu.reindex(attendu.index), attendu, check_names=False)
+
+
+def test_moyenne_tronquee_numba_equivalent_numpy(df, monkeypatch):
+    pytest.importorskip('numba')
+    codes = pd.factorize(df['g'])[0]
+    valeurs = df['v'].to_numpy()
+    avec_numba = GroupesTries(codes, valeurs).moyenne_tronquee()
+    monkeypatch.setattr(kernels, 'numba', None)
+    sans_numba = GroupesTries(codes, valeurs).moyenne_tronquee()
+
+    np.testing.assert_allclose(avec_numba, sans_numba)
+
+
+def test_masque_troncature_lignes_equivalent_pandas(df):
+    q = df.groupby('g')['v'].quantile([0.025, 0.975]).unstack()
+    q_bas, q_haut, garde = masque_troncature_lignes(df['g'], df['v'])
+
+    np.testing.assert_allclose(q_bas, df['g'].map(q[0.025]).to_numpy())
+    np.testing.assert_allclose(q_haut, df['g'].map(q[0.975]).to_numpy())
+    attendu = (df['v'] > df['g'].map(q[0.025])) & (df['v'] < df['g'].map(q[0.975]))
+    np.testing.assert_array_equal(garde, attendu.to_numpy())
+
+
+def test_statistiques_groupees_groupes_vides():
+    stats = statistiques_groupees(np.array([0, 0, 2, -1]), np.array([1.0, 3.0, 5.0, 7.0]), n_groupes=4)
+
+    np.testing.assert_array_equal(stats['count'], [2, 0, 1, 0])
+    np.testing.assert_array_equal(stats['mean'], [2.0, np.nan, 5.0, np.nan])
+    np.testing.assert_array_equal(stats['50%'], [2.0, np.nan, 5.0, np.nan])
+    assert np.isnan(stats.loc[2, 'std'])
@@ -0,0 +1,33 @@
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import box
+
+from scripts import spatial_join
+from scripts.spatial_join import IndexSpatial
+
+
+def _zones():
+    return gpd.GeoDataFrame(
+        {'code': ['01', '02', '2A', '2B']},
+        geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1), box(0, 1, 1, 2), box(1, 1, 2, 2)],
+        crs='EPSG:4326',
+    )
+
+
+def test_assigner_boucle_et_arbre_identiques(monkeypatch):
+    rng = np.random.default_rng(0)
+    longitude = rng.uniform(-0.5, 2.5, 10_000)
+    latitude = rng.uniform(-0.5, 2.5, 10_000)
+    longitude[:10] = np.nan
+
+    par_boucle = IndexSpatial(_zones()).assigner(longitude, latitude, taille_lot=3_000)
+    monkeypatch.setattr(spatial_join, 'SEUIL_BOUCLE_ZONES', 0)
+    par_arbre = IndexSpatial(_zones()).assigner(longitude, latitude, taille_lot=3_000)
+
+    np.testing.assert_array_equal(par_boucle, par_arbre)
+    assert all(c is None for c in par_boucle[:10])
+    attendu = np.where(latitude[10:] < 1, np.where(longitude[10:] < 1, '01', '02'),
+                       np.where(longitude[10:] < 1, '2A', '2B'))
+    dedans = (longitude[10:] > 0) & (longitude[10:] < 2) & (latitude[10:] > 0) & (latitude[10:] < 2)
+    np.testing.assert_array_equal(par_boucle[10:][dedans].astype(str), attendu[dedans])
+    assert all(c is None for c in par_boucle[10:][~dedans])
@@ -0,0 +1,34 @@
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import box
+
+from scripts.spatial_weights import charger_poids
+
+
+def _grille(path):
+    """
+    Quatre zones carrées en grille 2 x 2, écrites en GeoJSON.
+    """
+    zones = gpd.GeoDataFrame(
+        {'code': ['01', '02', '2A', '2B']},
+        geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1), box(0, 1, 1, 2), box(1, 1, 2, 2)],
+        crs='EPSG:4326',
+    )
+    zones.to_file(path, driver='GeoJSON')
+
+
+def test_charger_poids_relit_le_cache(tmp_path):
+    path = tmp_path / 'zones.geojson'
+    _grille(path)
+    cache = tmp_path / 'cache'
+
+    construit = charger_poids(str(path), cache_dir=str(cache))
+    relu = charger_poids(str(path), cache_dir=str(cache))
+
+    assert len(list(cache.glob('*.npz'))) == 1
+    np.testing.assert_array_equal(relu.codes, construit.codes)
+    assert relu.codes.dtype.kind == 'U'
+    np.testing.assert_allclose(relu.matrice.toarray(), construit.matrice.toarray())
+    # Contiguïté « reine » : chaque case touche les trois autres
+    np.testing.assert_allclose(relu.matrice.sum(axis=1), 1.0)
+    assert relu.matrice.nnz == 12
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from scripts.transaction_store import ecrire_store, ouvrir_store
+
+
+def _transactions():
+    return pd.DataFrame({
+        'code_commune': ['01001', '75056', '2A004'],
+        'type_local': ['Maison', 'Appartement', 'Maison'],
+        'surface_reelle_bati': [100.0, 40.0, np.nan],
+        'date_mutation': pd.to_datetime(['2023-01-05', '2023-02-10', '2023-03-15']),
+    })
+
+
+def test_aller_retour_index_par_defaut(tmp_path):
+    df = _transactions()
+    ecrire_store(df, tmp_path / 'store')
+
+    relu = ouvrir_store(tmp_path / 'store').to_frame()
+
+    pd.testing.assert_frame_equal(relu.astype({'type_local': object, 'code_commune': object}), df,
+                                  check_dtype=False)
+    assert isinstance(relu.index, pd.RangeIndex)
+
+
+def test_aller_retour_index_nomme(tmp_path):
+    df = _transactions().set_index('code_commune')
+    ecrire_store(df, tmp_path / 'store')
+    # Réécriture : l'ancien store est remplacé
+    ecrire_store(df, tmp_path / 'store')
+
+    store = ouvrir_store(tmp_path / 'store')
+    relu = store.to_frame()
+
+    assert store.colonnes == ['type_local', 'surface_reelle_bati', 'date_mutation']
+    assert relu.index.name == 'code_commune'
+    assert list(relu.index) == ['01001', '75056', '2A004']
+    assert list(store.to_frame(['surface_reelle_bati'], masque=np.array([1])).index) == ['75056']